@@ -5,7 +5,8 @@ Automated shortening of sequences in FASTA format
 VERSION: November2023
 
 Dowload the asv sequences in a .txt or .seq file. Make sure the file is in 
-FASTA format!
+FASTA format! Sequences may be on one line or wrapped over multiple lines.
+The file may be gzipped (.seq.gz), it is read without decompressing it first.
 The name of the file should be the NIOZ number of the sequence lane.
 This protocol uses the relative paths from the GitHub folder.
 Add the relative path to this file behind 'pathway'.
@@ -20,72 +21,77 @@ the domain name of the species.
 
 @author: rdebeer
 """
-#import the package named panda
-import pandas
+import os, sys
+import argparse
+
+#makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.shortening import shorten_fasta
+from moltools.taxonomy import TaxonomyIndex
 
 #you can customize the output of the protocol. 
 extention = True #makes it possible to dissable the addition of the A-string, if False, it doesn't add the A-string. If true, it adds the A-string
 tax = True #adds the domain of the species, if False, it adds unknown to the sequence
+rank = 'domain' #the rank that is added if tax = True: domain, phylum, class, order, family, genus or species
+compress = False #if True, the output is saved gzipped (.seq.gz)
+threads = 4 #number of threads used to compress the output, only used if compress = True
+dereplicate = False #if True, identical shortened sequences are saved once, with ';size=' and the number of ASVs behind the name. A table with the ASVs per sequence is saved as <NIOZ>_shortened_dereplication.txt
+workers = 1 #number of processes used for the shortening, use more for very large files (e.g. 32 on the analysis computer)
 
-#checks if you want to add the domain name to the FASTA output
-if tax:
 #makes a variable named file for the file with the ASV table
-    file = "molecular_tools/FASTA shortening/asvTable_noSingletons.txt"
+file = "molecular_tools/FASTA shortening/asvTable_noSingletons.txt"
+#creates a variable for the file you want to use. You can use a .txt or .seq as starting point. the pathway to your file behind pathway
+pathway = "molecular_tools/FASTA shortening/NIOZ354.seq"
+#if you only need some of the ASVs, put the pathway to a .txt file with one ASV number per line (e.g. asv.12) behind subset.
+#the ASVs are then looked up with an index file (NIOZ354.seq.fai) instead of reading the whole file. None shortens all ASVs
+subset = None
 
-#changes the .txt file to a csv file
-    ASV_table = pandas.read_csv(file,delimiter="\t",header=1)
+#everything below only runs when the script itself is started, not in the 
+#extra processes that are started when workers is more than 1
+if __name__ == '__main__':
+    #the number of workers can also be given on the command line:
+    #python "shortening of sequences.py" --workers 32
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=workers)
+    workers = parser.parse_known_args()[0].workers
 
-#creates a dictonary for the taxonomy per ASV number
+    #creates a dictonary for the taxonomy per ASV number
     taxonomies = {} 
 
-#adds the taxonomy to the dictonary per ASV number
-    for i in ASV_table.index:
-        ASV = ASV_table["#OTU ID"][i]
-        taxonomy = (str((ASV_table["taxonomy"][i]))).split(";")[0]
-        taxonomies[ASV] = taxonomy
-
-#creates a variable for the file you want to use. You can use a .txt or .seq as starting point. the pathway to your file behind pathway
-pathway = "molecular_tools/FASTA shortening/NIOZ354.seq"
-#creates a variable for the NIOZ number using the name of the file in the pathway above
-NIOZ = pathway[-11:-4]
-#opens the file using the variable you created above and creates it under the variable 'data'
-data = open(pathway)
+    #checks if you want to add the domain name to the FASTA output
+    #if you don't want to add the domain, the dictonary stays empty so every ASV gets 'unknown'
+    if tax:
+    #the first time, only the '#OTU ID' and 'taxonomy' columns of the ASV table are read and saved in an index file
+    #(asvTable_noSingletons.txt.taxonomy.sqlite). Next runs use this index, unless the ASV table has changed.
+        with TaxonomyIndex(file) as index:
+            taxonomies = index.as_dict(rank)
 
-#creates the output variable, this will be later used to export to the new .txt file
-output1 = ""
-AA = "" #a variable to add a 'n' amount of A's behind every sequence.
+    #reads the list of ASVs you want to shorten
+    ASVs = None
+    if subset:
+        with open(subset) as f:
+            ASVs = [line.strip() for line in f if line.strip()]
 
+    #creates a variable for the NIOZ number using the name of the file in the pathway above (without .seq or .seq.gz)
+    NIOZ = os.path.basename(pathway).split('.')[0]
 
-if extention: #executes the next lines if extention = True
-    for i in range(0,20): #sets the amount of A's in the string
-        AA = AA + 'A' #loop to create the string
-    
-#creates a loop that checks every line in the file you opened
-for line in data:
+    #a string of A's that is added behind every sequence, empty if extention = False
+    AA = 'A' * 20 if extention else ''
 
-#checks if the line stats with '>', if it does, it checks if the ASV number found on that line is the same as the ASV number in the dictonary.
-#if this is not the case, it adds unknown as taxonomy
-    if line.startswith('>'):
-        try:    
-            ASV = line[1:].strip() #.strip deletes the enter at the end of the line
-            domain = taxonomies[ASV] 
-        except:
-            domain = "unknown" #adds unknown as domain to the sequence if the domain is not in the dictonary
-        #generates the output you add for every line in the file to the variable you created in line 55    
-        output1 = output1 + line.strip() + "_" + domain + "_" + NIOZ + "\n"
-#if the line doesn't start with a >, it takes the first 50 characters on the line and adds this to the output. "\n" adds a new line to the output
-    else:
-        output1 = output1 +line[0:50] + AA + "\n"
-    
-#creates a new .seq file in the right folder. NIOZ is the variable you have created above.
-#if you want to create a .txt file, change .seq to .txt
-#'w' is a function for writing to the file. 'as f' creates a variable you use in the next line
-#if you want to save the file somewhere else, change the first argument to another folder, leave the rest as it currently is.
-with open('molecular_tools/FASTA shortening/verkorte data/' + NIOZ + "_shortened.seq", 'w') as f:
-#writes the output variable you created in line 15 to the file you created
-    f.write(output1)
+    #reads the file record by record (wrapped sequences are joined), shortens every sequence to 50 characters and 
+    #writes it directly to the new .seq file in the right folder. NIOZ is the variable you have created above.
+    #nothing is kept in memory, so this also works for very large files.
+    #with more than 1 worker, the file is split in parts that are shortened at the same time, the order stays the same.
+    #if you want to create a .txt file, change .seq to .txt
+    #if you want to save the file somewhere else, change the first part of the path to another folder, leave the rest as it currently is.
+    output_path = 'molecular_tools/FASTA shortening/verkorte data/' + NIOZ + "_shortened.seq"
+    if compress:
+        output_path = output_path + '.gz'
+    derep_table = None
+    if dereplicate:
+        derep_table = 'molecular_tools/FASTA shortening/verkorte data/' + NIOZ + "_shortened_dereplication.txt"
+    shorten_fasta(pathway, output_path, taxonomies, NIOZ, length=50, tail=AA,
+                  threads=threads, workers=workers, derep_table=derep_table,
+                  subset=ASVs)
 
-#closes the .txt file so you can work with it outside Spyder
-data.close()
-f.close()
-print("The shortening of your sequence data has been completed")
\ No newline at end of file
+    print("The shortening of your sequence data has been completed")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Quality trimming and shortening of reads in FASTQ format
+
+VERSION: October2026
+
+Use this for raw reads (e.g. 515F_NIOZ354_bacterie.fastq) before sending them
+on, instead of exporting them to other tools. The file may be gzipped
+(.fastq.gz), it is read without decompressing it first.
+
+- threshold: the 3' end of every read is trimmed where the quality drops below
+  this phred score (same method as BWA and cutadapt). None: no quality trimming
+- length: every read is cut to this length. None: no cutting
+- min_length: reads that are shorter than this after trimming are removed
+- primer / reverse_primer: if filled in, the primer is removed from the start
+  of the reads first. Degenerate bases (Y, M, R, N, ...) are allowed. Reads
+  (pairs) without the primer are removed. None: no primer removal
+
+The trimmed reads are saved as <name>_trimmed.fastq in the 'verkorte data'
+folder (gzipped if compress = True).
+
+For paired reads, also fill in the reverse file behind pathway_reverse. Both
+files are then read at the same time, the read names of each pair are checked
+and a pair is only kept if both reads are at least min_length long.
+"""
+import os, sys
+
+#makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.fastq import trim_fastq
+from moltools.paired import trim_pairs
+
+#you can customize the output of the protocol.
+threshold = 20 #phred score for the 3' quality trimming, None to skip
+length = 250 #maximum length of the reads, None to skip
+min_length = 50 #reads shorter than this after trimming are removed
+primer = None #e.g. 'GTGYCAGCMGCCGCGGTAA' for 515F, None to skip
+reverse_primer = None #e.g. 'CCGYCAATTYMTTTRAGTTT' for 926R, None to skip
+primer_mismatches = 1 #number of mismatches allowed in the primer
+compress = False #if True, the output is saved gzipped (.fastq.gz)
+threads = 4 #number of threads used to compress the output, only used if compress = True
+
+#the pathway to your file behind pathway
+pathway = "molecular_tools/FASTA shortening/515F_NIOZ354_bacterie.fastq"
+#for paired reads the pathway to the reverse file, None for single reads
+pathway_reverse = "molecular_tools/FASTA shortening/926R_NIOZ354_bacterie.fastq"
+
+#name of the output file(s), without .fastq or .fastq.gz
+def output_for(path):
+    name = os.path.basename(path).split('.')[0]
+    output_path = 'molecular_tools/FASTA shortening/verkorte data/' + name + "_trimmed.fastq"
+    if compress:
+        output_path = output_path + '.gz'
+    return output_path
+
+if pathway_reverse:
+    counts = trim_pairs(pathway, pathway_reverse, output_for(pathway),
+                        output_for(pathway_reverse), threshold=threshold,
+                        length=length, min_length=min_length, threads=threads,
+                        primer=primer, rev_primer=reverse_primer,
+                        primer_mismatches=primer_mismatches)
+    print(f"{counts['pairs_in']} read pairs were read")
+    print(f"{counts['pairs_out']} read pairs were saved in:\n{output_for(pathway)}\n{output_for(pathway_reverse)}")
+else:
+    counts = trim_fastq(pathway, output_for(pathway), threshold=threshold,
+                        length=length, min_length=min_length, threads=threads,
+                        primer=primer, primer_mismatches=primer_mismatches)
+    print(f"{counts['reads_in']} reads ({counts['bases_in']} bases) were read")
+    print(f"{counts['reads_out']} reads ({counts['bases_out']} bases) were saved in:\n{output_for(pathway)}")
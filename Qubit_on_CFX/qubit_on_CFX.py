@@ -17,10 +17,13 @@ Script for the Automation of qubit on CFX analysis
 """
 
 #### Import needed packages
+import os, sys
 import pandas as pd, numpy as np
-from scipy import stats
 from matplotlib import pyplot as plt
 from natsort import index_natsorted 
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.stdcurve import fit_curve
 
 #### Import file
 file_path = '//zeus.nioz.nl/mmb/molecular_ecology/mollab_team/Projects/2024/MMB/Pierre/53_xc.b.mn_Jamie_Qubit -  End Point Results.xlsx'
@@ -42,22 +45,15 @@ for i, assay in enumerate(['BR', 'HS']):
     stdcurve = data[(data["Sample"].str.startswith(assay + " "))]
     # If the specific assay was measured, get curve data
     if not stdcurve.empty:
-        stdcurve ["ng"] = ''
-        # get the concentrations of the original standards
-        for standard in stdcurve.index:
-            # extract concentration
-            concentration = float(stdcurve["Sample"][standard].split(' ')[1])
-            # 2µL was added for the standards, so multiply concentration by 2
-            concentration = concentration * 2
-            # add concentration to the dataframe
-            stdcurve.at[standard, "ng"] = concentration
+        # get the concentrations of the original standards (all at once)
+        # 2µL was added for the standards, so multiply concentration by 2
+        stdcurve["ng"] = (
+            stdcurve["Sample"].str.split(' ').str[1].astype(float) * 2)
             
-        # Get info about the curve
-        slope, intercept, rv, pv, se = stats.linregress(stdcurve["ng"].astype(float),
-                                                        stdcurve["End RFU"])
-        interp = np.linspace(np.min(stdcurve["ng"]),
-                              np.max(stdcurve["ng"]),
-                              num=500)        
+        # Get info about the curve (linear, not log like for qPCR)
+        curve = fit_curve(stdcurve["ng"], stdcurve["End RFU"], log=False)
+        slope, intercept = curve.slope, curve.intercept
+        interp = curve.line(num=500)[0]
 ## Plot both standard curves
         # Put the curve of 1st assay on the left, 2nd on the right
         assay_ax = ax[i]
@@ -87,17 +83,12 @@ for i, assay in enumerate(['BR', 'HS']):
         # Add sample names and RFU columns to results dataframe
         dataframes[i]["Sample"] = DNA_concentrations["Sample"]
         dataframes[i][assay + "_RFU"] = DNA_concentrations["End RFU"]
-        # Add a new column for the concentration
-        dataframes[i][assay + "_[DNA] ng/µL"] = ''
-        # for every sample calculate concentration ((RFU - y-intercept) / slope)
-        for sample in dataframes[i].index:
-            concentration = (
-                ((dataframes[i][assay + '_RFU'][sample]) - intercept) 
-                / slope) 
-            # Add concentration to the dataframe
-            dataframes[i].at[sample, assay + '_[DNA] ng/µL'] = concentration
-            # Get rid of assay name in sample names, to be able to merge samples
-            dataframes[i]['Sample'][sample] = (dataframes[i]['Sample'][sample].split(assay + '_')[1])
+        # for all samples calculate concentration ((RFU - y-intercept) / slope)
+        dataframes[i][assay + "_[DNA] ng/µL"] = (
+            curve.quantity(dataframes[i][assay + '_RFU']))
+        # Get rid of assay name in sample names, to be able to merge samples
+        dataframes[i]['Sample'] = (
+            dataframes[i]['Sample'].str.split(assay + '_').str[1])
 
 ## Make plot layout fit better
 plt.tight_layout()
@@ -0,0 +1,46 @@
+# =============================================================================
+# Title:    Demultiplexing of reads with the mapping file
+# Version:  1.0
+# Goal:     Split a sequencing lane into one FASTQ file per sample
+# Date:     261018
+# =============================================================================
+# Make the mapping file with mapping_file_creator.py first.
+# The barcode of every read is the last part of the read name, e.g.
+# @VH00208:231:AACN3V5M5:1:1101:27320:1000:AAGGAAAAT -> AAGGAAAAT
+# and is compared with the BarcodeSequence column of the mapping file.
+# With mismatches = 1, barcodes with one sequencing error are also assigned
+# (unless they could belong to two samples).
+# Reads without a matching barcode are saved as unassigned.
+# The files may be gzipped (.fastq.gz).
+# =============================================================================
+
+# IMPORT STATEMENTS============================================================
+# =============================================================================
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.demultiplex import demultiplex
+# =============================================================================
+
+# VARIABLES TO SET#!!!=========================================================
+# =============================================================================
+mapping_file = 'molecular_tools/mapping_file_creator/test_run_mapping_file.txt'
+forward_reads = 'molecular_tools/FASTA shortening/515F_NIOZ354_bacterie.fastq'
+# reverse reads, None for single reads
+reverse_reads = 'molecular_tools/FASTA shortening/926R_NIOZ354_bacterie.fastq'
+# folder for the files per sample
+output_folder = 'molecular_tools/demultiplexing/NIOZ354/'
+mismatches = 1      # 0 or 1 mismatches allowed in the barcode
+compress = False    # if True, the files per sample are gzipped
+threads = 4         # threads used for compressing the output
+# =============================================================================
+
+# DEMULTIPLEXING===============================================================
+# =============================================================================
+counts = demultiplex(mapping_file, forward_reads, output_folder,
+                     rev_path=reverse_reads, mismatches=mismatches,
+                     compress=compress, threads=threads)
+for sample, reads in counts.items():
+    print(f'{sample}\t{reads}')
+print(f"Your demultiplexed reads can be found here: \n{output_folder}")
+# =============================================================================
@@ -0,0 +1,43 @@
+# =============================================================================
+# Title:    Read count census per barcode combination
+# Version:  1.0
+# Goal:     Count reads per sample and find unexpected barcode combinations
+# Date:     261018
+# =============================================================================
+# Counts the barcode in the read name of every read, e.g.
+# @VH00208:231:AACN3V5M5:1:1101:27320:1000:AAGGAAAAT -> AAGGAAAAT
+# in one or more FASTQ files (may be gzipped) and compares them with the
+# mapping file. The result has one row per barcode with the status:
+#   expected    the barcode is in the mapping file
+#   crosstalk   forward and reverse barcode are in the mapping file, but not
+#               in this combination
+#   unexpected  unknown barcode (or sequencing errors)
+# Files are counted at the same time on 'workers' processes.
+# =============================================================================
+
+# IMPORT STATEMENTS============================================================
+# =============================================================================
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.census import census
+# =============================================================================
+
+# VARIABLES TO SET#!!!=========================================================
+# =============================================================================
+mapping_file = 'molecular_tools/mapping_file_creator/test_run_mapping_file.txt'
+fastq_files = ['molecular_tools/FASTA shortening/515F_NIOZ354_bacterie.fastq']
+workers = 4
+output_file = 'molecular_tools/demultiplexing/NIOZ354_read_counts.txt'
+# =============================================================================
+
+# COUNTING=====================================================================
+# =============================================================================
+# the if statement is needed to use more than 1 worker on Windows
+if __name__ == '__main__':
+    read_counts = census(fastq_files, mapping_file, workers=workers)
+    read_counts.to_csv(output_file, sep='\t', index=False)
+
+    print(read_counts.groupby('status')['reads'].sum())
+    print(f"The read counts can be found here: \n{output_file}")
+# =============================================================================
@@ -0,0 +1,57 @@
+"""
+Barcode designer
+VERSION: Oct2026
+
+Designs new barcodes for extending a primer set (e.g. Linda's primers 9001
+and on) that keep a minimum distance (number of different bases) to:
+- all barcodes in primer_lists.xlsx (all sheets, forward and reverse)
+- the reverse complements of those barcodes
+- each other and their own reverse complement
+Candidates with a GC content outside gc_range or a run of more than max_run
+identical bases are not used.
+
+The new barcodes are saved as new_barcodes.txt (tab delimited), with their
+reverse complement, so they can be added to primer_lists.xlsx.
+"""
+
+#### Import needed packages
+import pandas as pd       # to be able to work with dataframes
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.designer import design_barcodes
+from moltools.revcomp import reverse_complement_column
+
+# !!! Set variables
+number_of_barcodes = 100
+barcode_length = 12
+min_distance = 3
+gc_range = (0.4, 0.6)
+max_run = 3
+primer_lists = "molecular_tools/mapping_file_creator/primer_lists.xlsx"
+output_file = "molecular_tools/mapping_file_creator/new_barcodes.txt"
+
+#### Collect all existing barcodes from all sheets
+existing = []
+for sheet in pd.read_excel(primer_lists, sheet_name=None,
+                           engine='openpyxl').values():
+    for column in ['Barcode_Forward_Primer', 'Barcode_Reverse_Primer']:
+        if column in sheet.columns:
+            existing.extend(sheet[column].dropna().astype(str))
+
+#### Design the new barcodes
+new_barcodes = design_barcodes(existing, number_of_barcodes,
+                               length=barcode_length,
+                               min_distance=min_distance,
+                               gc=gc_range, max_run=max_run)
+if len(new_barcodes) < number_of_barcodes:
+    print(f"Only {len(new_barcodes)} barcodes could be found, try a lower "
+          "min_distance or a longer barcode_length")
+
+#### Save the new barcodes
+df = pd.DataFrame()
+df['barcode'] = new_barcodes
+df['revcompl_barcode'] = reverse_complement_column(df['barcode'])
+df.to_csv(output_file, sep='\t', index=False)
+
+print(f"Your new barcodes can be found here: \n{output_file}")
@@ -1,6 +1,9 @@
 #### Import needed packages
 import pandas as pd       # to be able to work with dataframes
-from Bio.Seq import Seq   # to be able to do compl_rev
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.revcomp import reverse_complement_column  # to be able to do compl_rev
 
 #### Import needed files
 primers = pd.ExcelFile('primer_lists.xlsx')
@@ -8,18 +11,11 @@ primers = pd.ExcelFile('primer_lists.xlsx')
 fwd_primers = primers.parse('515F_Golay')
 rev_primers = primers.parse('951R_Golay')
 
-fwd_primers['RevCompl'] = ''
-rev_primers['RevCompl'] = ''
-
-for primer in fwd_primers.index:
-    barcode = Seq(fwd_primers['Barcode_Forward_Primer'][primer])
-    compl_rev_barcode = barcode.reverse_complement()
-    fwd_primers.at[primer, 'RevCompl'] = compl_rev_barcode
-
-for primer in rev_primers.index:
-    barcode = Seq(rev_primers['Barcode_Reverse_Primer'][primer])
-    compl_rev_barcode = barcode.reverse_complement()
-    rev_primers.at[primer, 'RevCompl'] = compl_rev_barcode
+# rev_compl of the whole barcode columns at once
+fwd_primers['RevCompl'] = (
+    reverse_complement_column(fwd_primers['Barcode_Forward_Primer']))
+rev_primers['RevCompl'] = (
+    reverse_complement_column(rev_primers['Barcode_Reverse_Primer']))
     
 df = pd.DataFrame()
 df['fwd_primer'] = fwd_primers['Forward_primer']
@@ -0,0 +1,14 @@
+"""
+Shared helpers for the molecular_tools scripts
+
+The scripts in this repository are meant to be run on their own (from Spyder
+or the command line). Code that is used by more than one script, or that has
+to be importable for multiprocessing, lives in this package.
+
+A script in one of the sub folders can use it by adding the repository root
+to the python path:
+
+    import os, sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from moltools import fasta
+"""
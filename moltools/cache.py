@@ -0,0 +1,38 @@
+"""
+Helpers to check if a cached file is still up to date
+
+A cache stores the signature of its source file. It is up to date when the
+modification time and size are unchanged, or, when those changed (e.g. the
+file was copied or touched), when the contents still have the same hash.
+"""
+import hashlib
+import os
+
+
+def file_hash(path):
+    """sha1 hash of the contents of a file, read in blocks of 1 MB."""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def file_signature(path, with_hash=True):
+    """Dictionary with the mtime, size and (optionally) hash of a file."""
+    stat = os.stat(path)
+    signature = {'mtime': str(stat.st_mtime_ns), 'size': str(stat.st_size)}
+    if with_hash:
+        signature['hash'] = file_hash(path)
+    return signature
+
+
+def is_unchanged(path, signature):
+    """True if the file still matches a signature made by file_signature."""
+    if not signature:
+        return False
+    current = file_signature(path, with_hash=False)
+    if (current['mtime'] == signature.get('mtime')
+            and current['size'] == signature.get('size')):
+        return True
+    return signature.get('hash') == file_hash(path)
@@ -0,0 +1,88 @@
+"""
+Read counts per barcode combination
+
+Counts the barcodes in the read names of one or more FASTQ files, without
+keeping reads in memory (only the header lines are looked at). Several files
+are counted at the same time on a pool of processes. The counts are joined to
+the mapping file, so you can see how many reads every sample got and which
+barcode combinations that are not in the mapping file (crosstalk) turn up.
+"""
+from collections import Counter
+from itertools import islice
+from multiprocessing import Pool
+
+import pandas as pd
+
+from moltools.demultiplex import barcode_from_header
+from moltools.seqfile import open_seqfile
+
+
+def count_barcodes(path):
+    """Counter barcode -> number of reads for one (gzipped) FASTQ file."""
+    with open_seqfile(path) as data:
+        # every 4th line is a header
+        return Counter(map(barcode_from_header,
+                           (line[1:] for line in islice(data, 0, None, 4))))
+
+
+def count_barcodes_files(paths, workers=1):
+    """Total barcode Counter of several files, counted in parallel."""
+    counts = Counter()
+    if workers > 1 and len(paths) > 1:
+        with Pool(min(workers, len(paths))) as pool:
+            for file_counts in pool.imap_unordered(count_barcodes, paths):
+                counts.update(file_counts)
+    else:
+        for path in paths:
+            counts.update(count_barcodes(path))
+    return counts
+
+
+def census_table(counts, mapping_file):
+    """
+    Table with one row per barcode: the #SampleID and primer names from the
+    mapping file, the number of reads and a status:
+    - expected:   the barcode is in the mapping file
+    - crosstalk:  forward and reverse barcode are both used in the mapping
+                  file, but not in this combination
+    - unexpected: anything else (unknown barcode or sequencing errors)
+    Barcodes from the mapping file without reads are included with 0 reads.
+    """
+    mf = pd.read_csv(mapping_file, delimiter='\t', dtype=str)
+    mf['BarcodeSequence'] = mf['BarcodeSequence'].str.upper()
+    census = pd.DataFrame({'BarcodeSequence': list(counts),
+                           'reads': list(counts.values())})
+    census = pd.merge(mf[['#SampleID', 'BarcodeSequence']], census,
+                      on='BarcodeSequence', how='outer')
+    census['reads'] = census['reads'].fillna(0).astype(int)
+    census['status'] = 'unexpected'
+    census.loc[census['#SampleID'].notna(), 'status'] = 'expected'
+
+    # split unknown combinations in a forward and a reverse part
+    if {'Forward_barcode', 'ForwardPrimerName', 'ReversePrimerName'} <= set(
+            mf.columns):
+        fwd_length = mf['Forward_barcode'].str.len()
+        forward = dict(zip(mf['Forward_barcode'].str.upper(),
+                           mf['ForwardPrimerName']))
+        reverse = dict(zip(
+            [barcode[length:] for barcode, length
+             in zip(mf['BarcodeSequence'], fwd_length)],
+            mf['ReversePrimerName']))
+        length = int(fwd_length.mode().iloc[0]) if len(mf) else 0
+        census['ForwardPrimerName'] = (
+            census['BarcodeSequence'].str[:length].map(forward))
+        census['ReversePrimerName'] = (
+            census['BarcodeSequence'].str[length:].map(reverse))
+        crosstalk = (census['#SampleID'].isna()
+                     & census['ForwardPrimerName'].notna()
+                     & census['ReversePrimerName'].notna())
+        census.loc[crosstalk, 'status'] = 'crosstalk'
+    return census.sort_values('reads', ascending=False, ignore_index=True)
+
+
+def census(paths, mapping_file, workers=1):
+    """Counts the barcodes in paths and returns the census_table."""
+    if isinstance(paths, str):
+        paths = [paths]
+    return census_table(count_barcodes_files(list(paths), workers),
+                        mapping_file)
@@ -0,0 +1,194 @@
+"""
+Demultiplexing of reads by their inline barcode
+
+The barcode of every read is taken from the read name (the last ':' field,
+e.g. '...:27320:1000:AAGGAAAAT') and looked up in a dictionary made from the
+BarcodeSequence and #SampleID columns of a mapping file. All barcodes with
+one mismatch (Hamming distance 1) are added to the dictionary beforehand, so
+error-tolerant matching is a single lookup per read. Barcodes with one
+mismatch that fit more than one sample are left out, those reads are
+unassigned.
+
+Reads are collected per sample and written to the sample files in large
+blocks. At most MAX_OPEN_FILES files are kept open, so there is no limit on
+the number of samples; a file that was closed to make room is appended to
+later (for gzipped output that adds a gzip member, which every tool reads).
+"""
+import os
+from collections import OrderedDict
+
+import pandas as pd
+
+from moltools.fastq import format_fastq, read_fastq
+from moltools.paired import read_pairs
+from moltools.seqfile import open_seqfile
+
+# Name used for reads without a matching barcode
+UNASSIGNED = 'unassigned'
+
+# Bases used for the barcodes with one mismatch
+BASES = 'ACGTN'
+
+# Amount of buffered output (in characters) before it is written to disk
+SAMPLE_BUFFER = 1024 * 1024
+TOTAL_BUFFER = 64 * 1024 * 1024
+
+# Maximum number of sample files that are open at the same time
+MAX_OPEN_FILES = 128
+
+
+def read_mapping_barcodes(mapping_file):
+    """
+    Dictionary BarcodeSequence -> #SampleID from a (tab delimited) mapping
+    file. Raises a ValueError if a barcode is used for more than one sample.
+    """
+    mf = pd.read_csv(mapping_file, delimiter='\t',
+                     usecols=['#SampleID', 'BarcodeSequence'], dtype=str)
+    mf = mf.dropna()
+    duplicated = mf['BarcodeSequence'].str.upper().duplicated(keep=False)
+    if duplicated.any():
+        raise ValueError('Barcodes used for more than one sample: ' + ', '.join(
+            mf.loc[duplicated, 'BarcodeSequence'].unique()))
+    return dict(zip(mf['BarcodeSequence'].str.upper(), mf['#SampleID']))
+
+
+def hamming_neighbours(barcode, bases=BASES):
+    """Generator with all barcodes that differ at exactly one position."""
+    for i, base in enumerate(barcode):
+        for other in bases:
+            if other != base:
+                yield barcode[:i] + other + barcode[i + 1:]
+
+
+def barcode_index(barcodes, mismatches=1):
+    """
+    Dictionary barcode -> sample, with the exact barcodes and (if mismatches
+    is 1) all unambiguous barcodes with one mismatch. Raises a ValueError if
+    a sample is called 'unassigned', that name is used for the reads without
+    a matching barcode.
+    """
+    reserved = [sample for sample in set(barcodes.values())
+                if str(sample).lower() == UNASSIGNED]
+    if reserved:
+        raise ValueError(f"Sample name {reserved[0]!r} is reserved for the "
+                         f"reads without a matching barcode, rename it")
+    index = dict(barcodes)
+    if mismatches == 0:
+        return index
+    if mismatches != 1:
+        raise ValueError('Only 0 or 1 mismatches are supported')
+    neighbours = {}
+    ambiguous = set()
+    for barcode, sample in barcodes.items():
+        for neighbour in hamming_neighbours(barcode):
+            if neighbour in index:
+                continue
+            if neighbours.setdefault(neighbour, sample) != sample:
+                ambiguous.add(neighbour)
+    for neighbour in ambiguous:
+        del neighbours[neighbour]
+    neighbours.update(index)
+    return neighbours
+
+
+def barcode_from_header(header):
+    """The inline barcode at the end of the read name."""
+    name = header.split(None, 1)[0] if header else ''
+    return name.rsplit(':', 1)[-1].upper()
+
+
+class SampleWriter:
+    """
+    Buffered writer for one output file per sample. Reads are kept per sample
+    and written to the files in blocks. The files stay open, the least
+    recently written one is closed when more than MAX_OPEN_FILES are open.
+    """
+
+    def __init__(self, folder, suffix='.fastq', threads=1):
+        self.folder = folder
+        self.suffix = suffix
+        self.threads = threads
+        self._buffers = {}
+        self._sizes = {}
+        self._total = 0
+        self._started = set()
+        self._files = OrderedDict()
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, sample):
+        return os.path.join(self.folder, sample + self.suffix)
+
+    def write(self, sample, text):
+        self._buffers.setdefault(sample, []).append(text)
+        self._sizes[sample] = self._sizes.get(sample, 0) + len(text)
+        self._total += len(text)
+        if self._sizes[sample] >= SAMPLE_BUFFER:
+            self._flush(sample)
+        elif self._total >= TOTAL_BUFFER:
+            self.flush()
+
+    def _file(self, sample):
+        if sample in self._files:
+            self._files.move_to_end(sample)
+            return self._files[sample]
+        if len(self._files) >= MAX_OPEN_FILES:
+            self._files.popitem(last=False)[1].close()
+        # the first block of a sample replaces an existing file
+        mode = 'at' if sample in self._started else 'wt'
+        self._started.add(sample)
+        f = self._files[sample] = open_seqfile(self.path(sample), mode,
+                                               threads=self.threads)
+        return f
+
+    def _flush(self, sample):
+        self._file(sample).write(''.join(self._buffers.pop(sample)))
+        self._total -= self._sizes.pop(sample)
+
+    def flush(self):
+        for sample in list(self._buffers):
+            self._flush(sample)
+
+    def close(self):
+        self.flush()
+        while self._files:
+            self._files.popitem()[1].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def demultiplex(mapping_file, fwd_path, out_folder, rev_path=None,
+                mismatches=1, compress=False, threads=1):
+    """
+    Splits the reads of fwd_path (and the mates in rev_path) into one file per
+    sample in out_folder: <SampleID>.fastq, or <SampleID>_R1.fastq and
+    <SampleID>_R2.fastq for paired reads. Reads without a matching barcode
+    go to 'unassigned'. Returns a dictionary with the number of reads (pairs)
+    per sample.
+    """
+    index = barcode_index(read_mapping_barcodes(mapping_file), mismatches)
+    counts = dict.fromkeys(index.values(), 0)
+    counts[UNASSIGNED] = 0
+    gz = '.gz' if compress else ''
+    if rev_path is None:
+        with open_seqfile(fwd_path) as data, \
+                SampleWriter(out_folder, '.fastq' + gz, threads) as out:
+            for read in read_fastq(data):
+                sample = index.get(barcode_from_header(read.header),
+                                   UNASSIGNED)
+                counts[sample] += 1
+                out.write(sample, format_fastq(read))
+        return counts
+    with open_seqfile(fwd_path) as fwd_data, \
+            open_seqfile(rev_path) as rev_data, \
+            SampleWriter(out_folder, '_R1.fastq' + gz, threads) as fwd_out, \
+            SampleWriter(out_folder, '_R2.fastq' + gz, threads) as rev_out:
+        for fwd, rev in read_pairs(fwd_data, rev_data):
+            sample = index.get(barcode_from_header(fwd.header), UNASSIGNED)
+            counts[sample] += 1
+            fwd_out.write(sample, format_fastq(fwd))
+            rev_out.write(sample, format_fastq(rev))
+    return counts
@@ -0,0 +1,31 @@
+"""
+Dereplication of (shortened) sequences
+
+Identical sequences are collapsed into one record. The record keeps the
+header of the first sequence and gets ';size=<number of sequences>' added,
+the format used by vsearch/usearch. A mapping table (tab delimited) tells for
+every original header which record it was collapsed into.
+"""
+from moltools.fasta import FastaRecord
+
+
+def dereplicate(records, map_handle=None):
+    """
+    Collapses identical sequences of a stream of records (FastaRecords or
+    (header, sequence) tuples). The unique sequences are kept in a dictionary
+    (a hash table on the sequence), the members are written to map_handle as
+    they come in. Returns the unique FastaRecords in order of first
+    appearance.
+    """
+    uniques = {}
+    if map_handle is not None:
+        map_handle.write('header\tdereplicated_header\n')
+    for header, sequence in records:
+        unique = uniques.get(sequence)
+        if unique is None:
+            unique = uniques[sequence] = [header, 0]
+        unique[1] += 1
+        if map_handle is not None:
+            map_handle.write(header + '\t' + unique[0] + '\n')
+    return [FastaRecord(f'{header};size={size}', sequence)
+            for sequence, (header, size) in uniques.items()]
@@ -0,0 +1,151 @@
+"""
+Design of new barcodes that keep a minimum distance to a barcode set
+
+Random candidate barcodes are proposed and accepted when they are at least
+min_distance away from every existing barcode, from the reverse complement of
+every existing barcode, and from their own reverse complement. The existing
+(and accepted) barcodes are kept in a BK-tree, a metric index that only has
+to visit a small part of the set to know whether a barcode is too close.
+"""
+import random
+from operator import ne
+
+from moltools.revcomp import reverse_complement
+
+
+def hamming(a, b):
+    """Hamming distance of two strings of the same length."""
+    if len(a) != len(b):
+        raise ValueError('Hamming distance needs strings of the same length')
+    return sum(map(ne, a, b))
+
+
+def levenshtein(a, b):
+    """Edit distance (insertions, deletions and substitutions)."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree for a metric (hamming or levenshtein). Every node is
+    a list [item, {distance: child node}].
+    """
+
+    def __init__(self, metric=hamming, items=()):
+        self.metric = metric
+        self.root = None
+        self.size = 0
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, item):
+        if self.root is None:
+            self.root = [item, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = self.metric(item, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [item, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, item, radius):
+        """All (distance, item) in the tree within radius of item."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = self.metric(item, node[0])
+            if distance <= radius:
+                found.append((distance, node[0]))
+            # triangle inequality: only children in this range can be close
+            for d, child in node[1].items():
+                if distance - radius <= d <= distance + radius:
+                    stack.append(child)
+        return found
+
+    def has_within(self, item, radius):
+        """True if any item of the tree is within radius (stops early)."""
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = self.metric(item, node[0])
+            if distance <= radius:
+                return True
+            for d, child in node[1].items():
+                if distance - radius <= d <= distance + radius:
+                    stack.append(child)
+        return False
+
+
+def gc_content(barcode):
+    return (barcode.count('G') + barcode.count('C')) / len(barcode)
+
+
+def max_homopolymer(barcode):
+    """Length of the longest run of the same base."""
+    longest = run = 1
+    for previous, base in zip(barcode, barcode[1:]):
+        run = run + 1 if base == previous else 1
+        longest = max(longest, run)
+    return longest
+
+
+def design_barcodes(existing, number, length=12, min_distance=3,
+                    metric='hamming', gc=(0.4, 0.6), max_run=3,
+                    max_tries=None, seed=None):
+    """
+    Generates up to 'number' new barcodes of 'length' bases that are at least
+    min_distance away from all existing barcodes, their reverse complements,
+    each other and their own reverse complement. Candidates outside the GC
+    range or with a run of more than max_run identical bases are skipped.
+    Stops after max_tries candidates (default: 1000 per barcode), so fewer
+    barcodes are returned when the space is full.
+    """
+    distance = hamming if metric == 'hamming' else levenshtein
+    rng = random.Random(seed)
+    tree = BKTree(distance)
+    for barcode in existing:
+        if isinstance(barcode, str) and barcode:
+            barcode = barcode.upper()
+            if metric == 'hamming' and len(barcode) != length:
+                # other lengths can't be compared with the Hamming distance
+                continue
+            tree.add(barcode)
+            tree.add(reverse_complement(barcode))
+
+    new = []
+    max_tries = max_tries or 1000 * number
+    for _ in range(max_tries):
+        if len(new) == number:
+            break
+        candidate = ''.join(rng.choices('ACGT', k=length))
+        if not gc[0] <= gc_content(candidate) <= gc[1]:
+            continue
+        if max_homopolymer(candidate) > max_run:
+            continue
+        rc = reverse_complement(candidate)
+        if distance(candidate, rc) < min_distance:
+            continue
+        if tree.has_within(candidate, min_distance - 1):
+            continue
+        tree.add(candidate)
+        tree.add(rc)
+        new.append(candidate)
+    return new
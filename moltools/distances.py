@@ -0,0 +1,218 @@
+"""
+All-pairs distances within a barcode library
+
+For every barcode the smallest distance to any other barcode and to the
+reverse complement of any barcode (itself included) is calculated, and all
+pairs that are closer than min_distance are reported.
+
+The barcodes and their reverse complements are kept as PackedSequences (see
+packed.py).
+
+- hamming: the barcodes (same length) are compared on their packed bytes, 2
+  bits per base, read as 64 bit words. The distance is found with XOR and a bit count, for a whole block of
+  barcodes against the whole library at once.
+- edit:    Levenshtein distance with a banded dynamic programming matrix,
+  calculated for a block of barcodes against the whole library at once.
+  Only distances up to 'band' are exact, larger distances are given as
+  band + 1 (which is enough to check a minimum distance).
+
+The library is split in blocks of rows, which are calculated on a pool of
+processes when workers > 1.
+"""
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from moltools.packed import PackedSequences
+
+# Number of barcodes per block (rows of the distance matrix per step)
+BLOCK_SIZE = 256
+
+# Every other bit of a 64 bit word: one bit per 2 bit base
+_LOW_BITS = np.uint64(0x5555555555555555)
+# Code of the padding behind the shorter barcodes, never matches a base
+_PADDING = 4
+_BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Data of the library, set once per worker process
+_library = {}
+
+
+def encode_barcodes(barcodes):
+    """PackedSequences of the barcodes, which may only contain A, C, G and T."""
+    packed = PackedSequences.from_strings(barcodes)
+    if len(packed.exc_positions):
+        raise ValueError('Barcodes may only contain A, C, G and T')
+    return packed
+
+
+def popcount(words):
+    """Number of 1 bits in every element of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    as_bytes = words.view(np.uint8).reshape(words.shape + (8,))
+    return _BYTE_BITS[as_bytes].sum(axis=-1)
+
+
+def hamming_block(query_words, target_words):
+    """(queries x targets) matrix of Hamming distances of packed barcodes."""
+    x = query_words[:, None, :] ^ target_words[None, :, :]
+    return popcount((x | (x >> np.uint64(1))) & _LOW_BITS).sum(
+        axis=2).astype(np.int16)
+
+
+def edit_block(query_codes, query_lengths, target_codes, target_lengths,
+               band):
+    """
+    (queries x targets) matrix of edit distances, capped at band + 1. All
+    queries are processed together, one DP row at a time.
+    """
+    cap = band + 1
+    # the DP adds 1 to values up to cap before capping, so cap + 1 must fit
+    if cap < np.iinfo(np.uint8).max:
+        dp_type = np.uint8
+    elif cap < np.iinfo(np.int16).max:
+        dp_type = np.uint16
+    else:
+        raise ValueError('band must be smaller than 32766')
+    result = np.full((len(query_codes), len(target_codes)), cap,
+                     dtype=np.int16)
+    targets = np.arange(len(target_codes))
+    width = target_codes.shape[1]
+    # queries of the same length share the same DP matrix
+    for m in np.unique(query_lengths):
+        rows = np.flatnonzero(query_lengths == m)
+        q = query_codes[rows]
+        prev = np.full((len(rows), len(target_codes), width + 1), cap,
+                       dtype=dp_type)
+        first = min(width, band) + 1
+        prev[:, :, :first] = np.arange(first)
+        for i in range(1, int(m) + 1):
+            cur = np.full_like(prev, cap)
+            if i <= band:
+                cur[:, :, 0] = i
+            for j in range(max(1, i - band), min(width, i + band) + 1):
+                mismatch = (q[:, i - 1, None] !=
+                            target_codes[None, :, j - 1]).astype(dp_type)
+                value = np.minimum(prev[:, :, j - 1] + mismatch,
+                                   np.minimum(prev[:, :, j],
+                                              cur[:, :, j - 1]) + 1)
+                cur[:, :, j] = np.minimum(value, cap)
+            prev = cur
+        result[rows] = prev[:, targets, target_lengths]
+    return result
+
+
+def _init_library(library):
+    _library.clear()
+    _library.update(library)
+
+
+def _distance_block(task):
+    # distances of rows start-stop to all barcodes and to all reverse
+    # complements, returns the minima and the pairs below min_distance
+    start, stop = task
+    lib = _library
+    results = []
+    for kind in ('barcode', 'reverse complement') if lib['revcomp'] else \
+            ('barcode',):
+        target = 'rc_' if kind == 'reverse complement' else ''
+        if lib['metric'] == 'hamming':
+            block = hamming_block(lib['words'][start:stop],
+                                  lib[target + 'words'])
+        else:
+            block = edit_block(lib['codes'][start:stop],
+                               lib['lengths'][start:stop],
+                               lib[target + 'codes'],
+                               lib[target + 'lengths'], lib['band'])
+        rows = np.arange(stop - start)
+        if kind == 'barcode':
+            # a barcode is not compared with itself
+            block[rows, rows + start] = np.iinfo(np.int16).max
+        closest = block.argmin(axis=1)
+        minimum = block[rows, closest]
+        # every pair once: j > i for barcodes, j >= i for reverse complements
+        i, j = np.nonzero(block < lib['min_distance'])
+        i = i + start
+        keep = j > i if kind == 'barcode' else j >= i
+        results.append((minimum, closest,
+                        (i[keep], j[keep], block[i[keep] - start, j[keep]])))
+    return start, results
+
+
+def barcode_distances(names, barcodes, metric='hamming', min_distance=3,
+                      revcomp=True, band=None, workers=1,
+                      block_size=BLOCK_SIZE):
+    """
+    Calculates the distances within a barcode library.
+
+    metric          'hamming' (all barcodes the same length) or 'edit'
+    min_distance    pairs closer than this are reported
+    revcomp         also compare every barcode with all reverse complements
+    band            band of the edit distance DP (default: min_distance)
+
+    Returns two DataFrames:
+    summary     per barcode the minimum distance and the closest barcode (and
+                the same for the reverse complements)
+    pairs       all pairs with a distance < min_distance, with the type
+                'barcode' or 'reverse complement'
+    """
+    names = list(names)
+    barcodes = [str(barcode).upper() for barcode in barcodes]
+    if metric not in ('hamming', 'edit'):
+        raise ValueError("metric must be 'hamming' or 'edit'")
+    packed = encode_barcodes(barcodes)
+    rc_packed = packed.reverse_complement()
+    if metric == 'hamming' and len(set(packed.lengths.tolist())) > 1:
+        raise ValueError('Hamming distances need barcodes of the same '
+                         "length, use metric='edit'")
+    library = dict(metric=metric, min_distance=min_distance, revcomp=revcomp,
+                   band=band or min_distance)
+    if metric == 'hamming':
+        library.update(words=packed.words(), rc_words=rc_packed.words())
+    else:
+        library.update(codes=packed.code_matrix(_PADDING),
+                       lengths=packed.lengths,
+                       rc_codes=rc_packed.code_matrix(_PADDING),
+                       rc_lengths=rc_packed.lengths)
+
+    tasks = [(start, min(start + block_size, len(barcodes)))
+             for start in range(0, len(barcodes), block_size)]
+    if workers > 1 and len(tasks) > 1:
+        with Pool(workers, _init_library, (library,)) as pool:
+            blocks = sorted(pool.imap_unordered(_distance_block, tasks),
+                            key=lambda block: block[0])
+    else:
+        _init_library(library)
+        blocks = [_distance_block(task) for task in tasks]
+
+    summary = pd.DataFrame({'name': names, 'barcode': barcodes})
+    pairs = []
+    for k, kind in enumerate(('barcode', 'reverse complement')[
+            :1 + bool(revcomp)]):
+        minimum = np.concatenate([b[1][k][0] for b in blocks]) \
+            if blocks else np.array([], dtype=np.int16)
+        closest = np.concatenate([b[1][k][1] for b in blocks]) \
+            if blocks else np.array([], dtype=np.int64)
+        prefix = 'min_distance' if kind == 'barcode' else \
+            'min_distance_revcomp'
+        summary[prefix] = minimum
+        summary['closest' if kind == 'barcode' else 'closest_revcomp'] = [
+            names[j] for j in closest]
+        if kind == 'barcode' and len(barcodes) == 1:
+            summary[prefix] = np.nan
+            summary['closest'] = None
+        for block in blocks:
+            i, j, distance = block[1][k][2]
+            pairs.append(pd.DataFrame({
+                'name_1': [names[x] for x in i],
+                'barcode_1': [barcodes[x] for x in i],
+                'name_2': [names[x] for x in j],
+                'barcode_2': [barcodes[x] for x in j],
+                'distance': distance, 'type': kind}))
+    pairs = pd.concat(pairs, ignore_index=True) if pairs else pd.DataFrame(
+        columns=['name_1', 'barcode_1', 'name_2', 'barcode_2', 'distance',
+                 'type'])
+    return summary, pairs.sort_values(['distance', 'name_1'],
+                                      ignore_index=True)
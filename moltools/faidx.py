@@ -0,0 +1,143 @@
+"""
+Indexed random access to FASTA files
+
+build_fai() writes a samtools compatible .fai index next to a FASTA file, with
+for every record: name, length, byte offset of the sequence, bases per line
+and bytes per line. FastaIndex memory-maps the FASTA file and uses the index
+to get a record by its name (e.g. the ASV number) without reading the rest of
+the file.
+
+    index = FastaIndex('NIOZ354.seq')
+    index.fetch('asv.12')                # sequence as a string
+    for record in index.records(['asv.1', 'asv.40']):
+        ...
+"""
+import mmap
+import os
+
+from moltools.fasta import FastaRecord
+from moltools.seqfile import ENCODING, ERRORS, is_gzipped
+
+
+def build_fai(path, fai_path=None):
+    """
+    Writes the .fai index of an uncompressed FASTA file and returns the
+    entries as a dictionary name -> (length, offset, linebases, linewidth).
+    Raises a ValueError if the lines of a wrapped record have different
+    lengths, such records can't be indexed.
+    """
+    if is_gzipped(path):
+        raise ValueError(f'{path} is gzipped, decompress it to index it')
+    fai_path = fai_path or path + '.fai'
+    entries = {}
+    name = None
+
+    def add_entry():
+        if name in entries:
+            raise ValueError(f'{name} is in {path} more than once')
+        entries[name] = (length, offset, linebases, linewidth)
+
+    with open(path, 'rb') as f:
+        position = 0
+        for line in f:
+            if line.startswith(b'>'):
+                if name is not None:
+                    add_entry()
+                header = line[1:].decode(ENCODING, ERRORS).split()
+                name = header[0] if header else ''
+                offset = position + len(line)
+                length = linebases = linewidth = 0
+                short_line = False
+            elif name is not None:
+                bases = len(line.rstrip(b'\r\n'))
+                if bases:
+                    if short_line or (linebases and bases > linebases):
+                        raise ValueError(
+                            f'{name} in {path} has lines of different length')
+                    if not linebases:
+                        linebases, linewidth = bases, len(line)
+                    elif bases < linebases:
+                        short_line = True
+                    length += bases
+            position += len(line)
+        if name is not None:
+            add_entry()
+
+    with open(fai_path, 'w', encoding=ENCODING, errors=ERRORS) as f:
+        for name, entry in entries.items():
+            f.write(name + '\t' + '\t'.join(map(str, entry)) + '\n')
+    return entries
+
+
+def read_fai(fai_path):
+    """Reads a .fai index into a dictionary name -> entry."""
+    entries = {}
+    with open(fai_path, encoding=ENCODING, errors=ERRORS) as f:
+        for line in f:
+            name, *entry = line.rstrip('\n').split('\t')
+            entries[name] = tuple(map(int, entry[:4]))
+    return entries
+
+
+class FastaIndex:
+    """
+    Memory-mapped FASTA file with a .fai index. The index is built when it
+    doesn't exist or is older than the FASTA file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        fai_path = path + '.fai'
+        if (os.path.exists(fai_path)
+                and os.path.getmtime(fai_path) >= os.path.getmtime(path)):
+            self.entries = read_fai(fai_path)
+        else:
+            self.entries = build_fai(path, fai_path)
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(path) else b''
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def fetch_bytes(self, name):
+        """
+        The sequence of a record as bytes. For sequences on one line this is
+        a memoryview of the mapped file, so nothing is copied (release it
+        before the index is closed).
+        """
+        length, offset, linebases, linewidth = self.entries[name]
+        if length <= linebases:
+            return memoryview(self._map)[offset:offset + length]
+        lines, rest = divmod(length, linebases)
+        end = offset + lines * linewidth + rest
+        return self._map[offset:end].replace(b'\r', b'').replace(b'\n', b'')
+
+    def fetch(self, name):
+        """The sequence of a record as a string."""
+        return bytes(self.fetch_bytes(name)).decode('ascii')
+
+    def records(self, names, missing='raise'):
+        """
+        Generator with a FastaRecord for every name, in the given order.
+        missing='skip' leaves out names that are not in the file, otherwise a
+        KeyError is raised.
+        """
+        for name in names:
+            if name not in self.entries and missing == 'skip':
+                continue
+            yield FastaRecord(name, self.fetch(name))
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,116 @@
+"""
+Reading and writing of FASTA files
+
+Records are streamed one at a time, so the memory use does not depend on the
+size of the file. Files are opened with open_seqfile, so gzip/bgzip compressed
+input and output (.gz) are handled transparently. Sequences that are wrapped over multiple lines (60 or 80
+columns, as exported by most pipelines) are joined into one sequence.
+"""
+import io
+
+from moltools.seqfile import ENCODING, ERRORS, open_seqfile
+
+
+class FastaRecord:
+    """
+    One FASTA record: the header (without '>') and the complete sequence.
+    Uses __slots__ so millions of records don't need a dict each. A record can
+    be unpacked like a tuple: header, sequence = record
+    """
+    __slots__ = ('header', 'sequence')
+
+    def __init__(self, header, sequence):
+        self.header = header
+        self.sequence = sequence
+
+    @property
+    def id(self):
+        """The first word of the header, e.g. the ASV number."""
+        return self.header.split(None, 1)[0] if self.header else ''
+
+    def __iter__(self):
+        yield self.header
+        yield self.sequence
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __eq__(self, other):
+        if not isinstance(other, FastaRecord):
+            return NotImplemented
+        return (self.header == other.header
+                and self.sequence == other.sequence)
+
+    def __repr__(self):
+        return f'FastaRecord({self.header!r}, {self.sequence!r})'
+
+
+def read_fasta(handle):
+    """
+    Generator that yields a FastaRecord for every record in an opened FASTA
+    file. Wrapped sequence lines are collected and joined once per record.
+    Empty lines and anything before the first header are skipped.
+    """
+    header = None
+    lines = []
+    for line in handle:
+        if line.startswith('>'):
+            if header is not None:
+                yield FastaRecord(header, ''.join(lines))
+            header = line[1:].rstrip()
+            lines = []
+        elif header is not None:
+            line = line.rstrip()
+            if line:
+                lines.append(line)
+    if header is not None:
+        yield FastaRecord(header, ''.join(lines))
+
+
+def fasta_chunks(path, chunk_size=16 * 1024 * 1024):
+    """
+    Splits an uncompressed FASTA file into (start, end) byte ranges of about
+    chunk_size bytes. Every range starts at a '>' header line, so each chunk
+    contains complete records and can be parsed on its own.
+    """
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        start = 0
+        while start < size:
+            end = start + chunk_size
+            if end >= size:
+                end = size
+            else:
+                # go to the start of the next line, then to the next header
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+                line = f.readline()
+                while line and not line.startswith(b'>'):
+                    end = f.tell()
+                    line = f.readline()
+            yield start, end
+            start = end
+
+
+def read_fasta_chunk(path, start, end):
+    """Returns the FastaRecords in the byte range start-end of a file."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(ENCODING, ERRORS)
+    return list(read_fasta(io.StringIO(text)))
+
+
+def write_fasta(records, path, threads=1):
+    """
+    Writes records (FastaRecords or (header, sequence) tuples) to a FASTA file
+    with a buffered writer. Every sequence is written on one line. If path ends
+    in .gz the output is compressed with 'threads' threads.
+    Returns the number of records that were written.
+    """
+    count = 0
+    with open_seqfile(path, 'wt', threads=threads) as f:
+        for header, sequence in records:
+            f.write('>' + header + '\n' + sequence + '\n')
+            count += 1
+    return count
@@ -0,0 +1,277 @@
+"""
+Reading, trimming and writing of FASTQ files
+
+Reads are read in batches. The quality strings of a batch are decoded at once
+into a NumPy uint8 matrix (one row per read), so quality trimming and
+truncation are done with array operations instead of per base python loops.
+Files are opened with open_seqfile, so gzipped files can be used directly.
+
+    with open_seqfile('515F_NIOZ354_bacterie.fastq') as data:
+        for batch in read_fastq_batches(data):
+            lengths = quality_trim_lengths(batch, threshold=20)
+            trimmed = batch.truncate(lengths)
+"""
+from itertools import islice
+
+import numpy as np
+
+from moltools.iupac import primer_positions
+from moltools.seqfile import open_seqfile
+
+# Offset of the ASCII encoded quality scores (Sanger / Illumina 1.8+)
+PHRED_OFFSET = 33
+
+# Number of reads that are decoded and trimmed at once
+BATCH_SIZE = 10000
+
+
+class FastqRecord:
+    """
+    One FASTQ read: header (without '@'), sequence and quality string.
+    A record can be unpacked like a tuple: header, sequence, quality = record
+    """
+    __slots__ = ('header', 'sequence', 'quality')
+
+    def __init__(self, header, sequence, quality):
+        self.header = header
+        self.sequence = sequence
+        self.quality = quality
+
+    @property
+    def id(self):
+        """The first word of the header (the read name)."""
+        return self.header.split(None, 1)[0] if self.header else ''
+
+    def __iter__(self):
+        yield self.header
+        yield self.sequence
+        yield self.quality
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __eq__(self, other):
+        if not isinstance(other, FastqRecord):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f'FastqRecord({self.header!r}, {self.sequence!r}, ' \
+               f'{self.quality!r})'
+
+
+def read_fastq(handle):
+    """
+    Generator that yields a FastqRecord for every read in an opened FASTQ
+    file. Raises a ValueError if the file is not in 4-line FASTQ format.
+    """
+    for header in handle:
+        if not header.strip():
+            continue
+        sequence = handle.readline().rstrip()
+        plus = handle.readline()
+        quality = handle.readline().rstrip()
+        if not header.startswith('@') or not plus.startswith('+'):
+            raise ValueError(f'Not a FASTQ record: {header.rstrip()!r}')
+        if len(sequence) != len(quality):
+            raise ValueError('Sequence and quality have a different length '
+                             f'in {header.rstrip()!r}')
+        yield FastqRecord(header[1:].rstrip(), sequence, quality)
+
+
+class FastqBatch:
+    """
+    A batch of reads. headers, sequences and qualities are lists of strings,
+    lengths is a NumPy array with the length of every read.
+    """
+    __slots__ = ('headers', 'sequences', 'qualities', 'lengths')
+
+    def __init__(self, headers, sequences, qualities):
+        self.headers = headers
+        self.sequences = sequences
+        self.qualities = qualities
+        self.lengths = np.fromiter(map(len, sequences), dtype=np.int64,
+                                   count=len(sequences))
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        return cls([r.header for r in records], [r.sequence for r in records],
+                   [r.quality for r in records])
+
+    def __len__(self):
+        return len(self.headers)
+
+    def quality_matrix(self, offset=PHRED_OFFSET):
+        """
+        Decodes all quality strings into a (reads x longest read) uint8
+        matrix of phred scores. Positions after the end of a read are 0.
+        """
+        flat = np.frombuffer(''.join(self.qualities).encode('ascii'),
+                             dtype=np.uint8) - np.uint8(offset)
+        width = int(self.lengths.max()) if len(self) else 0
+        matrix = np.zeros((len(self), width), dtype=np.uint8)
+        matrix[np.arange(width) < self.lengths[:, None]] = flat
+        return matrix
+
+    def truncate(self, lengths):
+        """
+        Returns a new batch with every read cut to the given length (a number
+        for all reads or an array with a length per read).
+        """
+        lengths = np.minimum(self.lengths, lengths).tolist()
+        return FastqBatch(
+            self.headers,
+            [s[:n] for s, n in zip(self.sequences, lengths)],
+            [q[:n] for q, n in zip(self.qualities, lengths)])
+
+    def trim_start(self, starts):
+        """
+        Returns a new batch with the first bases of every read removed (a
+        number for all reads or an array with a number per read).
+        """
+        starts = np.broadcast_to(starts, self.lengths.shape).tolist()
+        return FastqBatch(
+            self.headers,
+            [s[n:] for s, n in zip(self.sequences, starts)],
+            [q[n:] for q, n in zip(self.qualities, starts)])
+
+    def select(self, keep):
+        """Returns a new batch with only the reads where keep is True."""
+        index = np.flatnonzero(keep).tolist()
+        return FastqBatch([self.headers[i] for i in index],
+                          [self.sequences[i] for i in index],
+                          [self.qualities[i] for i in index])
+
+    def records(self):
+        """Generator with a FastqRecord per read."""
+        for read in zip(self.headers, self.sequences, self.qualities):
+            yield FastqRecord(*read)
+
+
+def read_fastq_batches(handle, batch_size=BATCH_SIZE):
+    """Generator that yields FastqBatches of batch_size reads."""
+    records = read_fastq(handle)
+    while True:
+        batch = FastqBatch.from_records(islice(records, batch_size))
+        if not len(batch):
+            return
+        yield batch
+
+
+def quality_trim_index(quality, threshold=20, offset=PHRED_OFFSET):
+    """
+    Length of one read (quality string) after 3' quality trimming, the
+    algorithm of BWA and cutadapt: from the 3' end, sum (threshold - quality)
+    and stop as soon as the sum drops below 0. The read is cut where the sum
+    was highest (if that is above 0). Slow, see quality_trim_lengths for a
+    whole batch.
+    """
+    total = best = 0
+    cut = len(quality)
+    for i in range(len(quality) - 1, -1, -1):
+        total += threshold - (ord(quality[i]) - offset)
+        if total < 0:
+            break
+        if total > best:
+            best, cut = total, i
+    return cut
+
+
+def quality_trim_lengths(batch, threshold=20, offset=PHRED_OFFSET):
+    """
+    Length of every read after 3' quality trimming, with the same algorithm as
+    BWA and cutadapt (see quality_trim_index). Done for the whole batch at
+    once.
+    """
+    matrix = batch.quality_matrix(offset)
+    width = matrix.shape[1]
+    # no reads, or only empty reads (e.g. reads that were only the primer)
+    if width == 0:
+        return batch.lengths.copy()
+    valid = np.arange(width) < batch.lengths[:, None]
+    scores = np.where(valid, threshold - matrix.astype(np.int32), 0)
+    # running sum from the 3' end (columns reversed, the padding behind the
+    # shorter reads adds 0)
+    running = np.cumsum(scores[:, ::-1], axis=1)
+    # the scan stops at the first position where the sum drops below 0, the
+    # positions from there on (and the padding) can't be the cut
+    stopped = np.logical_or.accumulate(running < 0, axis=1)
+    running = np.where(stopped | ~valid[:, ::-1], -1, running)
+    # argmax takes the first maximum, so the one nearest to the 3' end
+    best_reversed = running.argmax(axis=1)
+    best = running[np.arange(len(batch)), best_reversed]
+    return np.where(best > 0, width - 1 - best_reversed, batch.lengths)
+
+
+def remove_primer(batch, primer, max_mismatches=0, max_shift=0):
+    """
+    Looks for the (degenerate) primer at the start of every read (shifted
+    up to max_shift bases) and cuts it off. Reads without the primer are
+    removed. Returns the trimmed batch and a boolean array with the reads that
+    had the primer.
+    """
+    positions = primer_positions(batch.sequences, primer, max_mismatches,
+                                 max_shift)
+    found = positions >= 0
+    batch = batch.select(found)
+    return batch.trim_start(positions[found] + len(primer)), found
+
+
+def trim_batch(batch, threshold=None, length=None):
+    """
+    Quality trims (threshold) and/or truncates (length) all reads of a batch.
+    Returns the trimmed batch.
+    """
+    lengths = batch.lengths
+    if threshold is not None:
+        lengths = quality_trim_lengths(batch, threshold)
+    if length is not None:
+        lengths = np.minimum(lengths, length)
+    return batch.truncate(lengths)
+
+
+def format_fastq(record):
+    """The 4 FASTQ lines of a FastqRecord or (header, sequence, quality)."""
+    header, sequence, quality = record
+    return '@' + header + '\n' + sequence + '\n+\n' + quality + '\n'
+
+
+def write_fastq(records, handle):
+    """
+    Writes FastqRecords or (header, sequence, quality) tuples to an opened
+    file. Returns the number of reads written.
+    """
+    count = 0
+    for record in records:
+        handle.write(format_fastq(record))
+        count += 1
+    return count
+
+
+def trim_fastq(in_path, out_path, threshold=None, length=None, min_length=0,
+               threads=1, batch_size=BATCH_SIZE, primer=None,
+               primer_mismatches=0, primer_shift=0):
+    """
+    Quality trims (threshold) and/or truncates (length) all reads of a FASTQ
+    file and removes reads shorter than min_length afterwards. If a
+    (degenerate) primer is given, it is removed from the start of the reads
+    first and reads without the primer are left out. Both files may be
+    gzipped. Returns a dictionary with the number of reads and bases before
+    and after.
+    """
+    counts = dict(reads_in=0, bases_in=0, reads_out=0, bases_out=0)
+    with open_seqfile(in_path) as data, \
+            open_seqfile(out_path, 'wt', threads=threads) as output:
+        for batch in read_fastq_batches(data, batch_size):
+            counts['reads_in'] += len(batch)
+            counts['bases_in'] += int(batch.lengths.sum())
+            if primer:
+                batch = remove_primer(batch, primer, primer_mismatches,
+                                      primer_shift)[0]
+            batch = trim_batch(batch, threshold, length)
+            if min_length:
+                batch = batch.select(batch.lengths >= min_length)
+            counts['reads_out'] += write_fastq(batch.records(), output)
+            counts['bases_out'] += int(batch.lengths.sum())
+    return counts
@@ -0,0 +1,96 @@
+"""
+Matching with degenerate (IUPAC) bases
+
+Every base is encoded as a 4 bit mask, one bit per nucleotide:
+A=0001, C=0010, G=0100, T=1000, R (A/G)=0101, ..., N=1111.
+Two bases match when their masks have a bit in common, so comparing a
+degenerate primer with (millions of) reads is one AND over NumPy arrays.
+
+    primer = '515F' sequence GTGYCAGCMGCCGCGGTAA
+    found = primer_positions(reads, 'GTGYCAGCMGCCGCGGTAA', max_mismatches=1)
+"""
+import numpy as np
+
+# Bit mask of every IUPAC character (upper and lower case), 0 for the rest
+BASE_MASKS = {'A': 1, 'C': 2, 'G': 4, 'T': 8, 'U': 8,
+              'R': 5, 'Y': 10, 'S': 6, 'W': 9, 'K': 12, 'M': 3,
+              'B': 14, 'D': 13, 'H': 11, 'V': 7, 'N': 15}
+MASK_TABLE = np.zeros(256, dtype=np.uint8)
+for _base, _mask in BASE_MASKS.items():
+    MASK_TABLE[ord(_base)] = MASK_TABLE[ord(_base.lower())] = _mask
+
+
+def encode_masks(sequence):
+    """uint8 array with the mask of every base of one sequence."""
+    return MASK_TABLE[np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)]
+
+
+def mask_matrix(sequences, width=None):
+    """
+    (sequences x width) uint8 matrix with the masks of the first width bases
+    of every sequence (width: longest sequence). Missing positions are 0 and
+    never match.
+    """
+    sequences = list(sequences)
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64,
+                          count=len(sequences))
+    if width is None:
+        width = int(lengths.max()) if len(sequences) else 0
+    lengths = np.minimum(lengths, width)
+    raw = np.frombuffer(
+        ''.join(s[:width] for s in sequences).encode('ascii'), dtype=np.uint8)
+    matrix = np.zeros((len(sequences), width), dtype=np.uint8)
+    matrix[np.arange(width) < lengths[:, None]] = MASK_TABLE[raw]
+    return matrix
+
+
+def is_degenerate(sequence):
+    """True if the sequence contains anything other than A, C, G and T."""
+    return any(base not in 'ACGT' for base in sequence.upper())
+
+
+def mismatches(pattern, matrix, start=0):
+    """
+    Number of mismatches of a (degenerate) pattern with every row of a mask
+    matrix, with the pattern placed at position start.
+    """
+    window = matrix[:, start:start + len(pattern)]
+    if window.shape[1] < len(pattern):
+        return np.full(len(matrix), len(pattern), dtype=np.int64)
+    return ((window & encode_masks(pattern)) == 0).sum(axis=1)
+
+
+def primer_positions(sequences, primer, max_mismatches=0, max_shift=0):
+    """
+    For every sequence the position where the primer starts (0 to
+    max_shift), or -1 if the primer is not found with at most max_mismatches
+    mismatches. The first (most 5') position is used.
+    """
+    matrix = mask_matrix(sequences, len(primer) + max_shift)
+    positions = np.full(len(matrix), -1, dtype=np.int64)
+    for shift in range(max_shift + 1):
+        found = (positions < 0) & (
+            mismatches(primer, matrix, shift) <= max_mismatches)
+        positions[found] = shift
+    return positions
+
+
+def degenerate_matches(patterns, sequences):
+    """
+    For every pattern the positions of the sequences (same length) it
+    matches, comparing whole mask matrices at once (one block per pattern
+    length).
+    """
+    sequences = list(sequences)
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64,
+                          count=len(sequences))
+    matches = []
+    for pattern in patterns:
+        same = np.flatnonzero(lengths == len(pattern))
+        if not len(pattern) or not len(same):
+            matches.append([])
+            continue
+        matrix = mask_matrix([sequences[i] for i in same], len(pattern))
+        hit = np.all(matrix & encode_masks(pattern), axis=1)
+        matches.append(same[hit].tolist())
+    return matches
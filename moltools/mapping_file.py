@@ -0,0 +1,249 @@
+"""
+Mapping file creation from a template
+
+The steps of mapping_file_creator.py as functions, so one template or a whole
+batch of templates (e.g. every lane and primer set) can be processed. For a
+batch, the primer catalog is loaded once and the templates are processed in
+parallel on a pool of processes. See mapping_file_creator.py for how to fill
+in a template.
+"""
+import glob
+import os
+from multiprocessing import Pool
+
+import pandas as pd
+
+from moltools.primer_catalog import PrimerCatalog
+
+# Template files that are picked up from a folder
+TEMPLATE_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+
+# Columns of the mapping file taken from the merged primer data (in order)
+MAPPING_COLUMNS = {
+    '#SampleID': '#SampleID',
+    'BarcodeSequence': 'BarcodeSequence',
+    'LinkerPrimerSequence': 'LinkerPrimerSequence',
+    'ReversePrimer': 'ReversePrimerSequence',
+    'Barcode_Forward_Primer': 'Forward_barcode',
+    'Barcode_Reverse_Primer': 'Reverse_barcode',
+    'Forward_primer': 'ForwardPrimerName',
+    'Reverse_primer': 'ReversePrimerName',
+}
+
+# Primer catalog, set once per worker process
+_catalog = {}
+
+
+def read_template(file_path):
+    """
+    Reads a template. Returns the FILL_IN data (with the Description column
+    moved to the end), the ReadMe/ProjectInfo sheet (None for a .csv) and the
+    NIOZ number.
+    """
+    if file_path.endswith(('.xlsx', '.xlsm')):
+        template = pd.ExcelFile(file_path)
+        # NIOZ number to name the mapping_file
+        if 'ProjectInfo' in template.sheet_names:
+            ReadMe = template.parse('ProjectInfo')
+        else:
+            ReadMe = template.parse('ReadMe')
+        NIOZnumber = (ReadMe.loc[ReadMe['Project_info'] == 'NIOZ_Number',
+                                 'example'].iloc[0])
+        # Only keep FILL_IN sheet
+        sample_file = template.parse('FILL_IN')
+    elif file_path.endswith('.csv'):
+        sample_file = pd.read_csv(file_path, delimiter=';')
+        ReadMe = None
+        NIOZnumber = 'NIOZ???'  # !!! fill in yourself
+    else:
+        raise ValueError(f'{file_path} is not an .xlsx, .xlsm or .csv file')
+
+    # Move the column named "Description" to the end of the DF
+    col_names = sample_file.columns.tolist()
+    col_names.remove("Description")
+    col_names.append("Description")
+    return sample_file[col_names], ReadMe, NIOZnumber
+
+
+def split_primer_name(primers):
+    """
+    Splits primer names in the primer set (sheet name) and the primer number
+    (last 4 characters if those are all digits, else the last 3).
+    """
+    example = primers.iloc[1]
+    digits = 4 if example[-4:].isdigit() else 3
+    return example[:-digits], primers.str.slice(-digits)
+
+
+def build_mapping_file(sample_file, NIOZnumber, catalog):
+    """
+    Assembles the mapping file DataFrame from the FILL_IN data, column by
+    column. Raises a ValueError if check_mapping_file() finds a problem.
+    """
+    #### Generate sampleIDs
+    df = pd.DataFrame()
+    # Insert primers
+    df['Forward_primer'] = sample_file['Forward_primer'].dropna()
+    df['Reverse_primer'] = sample_file['Reverse_primer'].dropna()
+    # Extract primernumbers (last 3-4 characters depending on the primer)
+    fw_primer, df['Forward_primer_number'] = split_primer_name(
+        sample_file['Forward_primer'])
+    rv_primer, df['Reverse_primer_number'] = split_primer_name(
+        sample_file['Reverse_primer'])
+    # Generate SampleIDs
+    df['#SampleID'] = (NIOZnumber + '.' + df['Forward_primer_number'] + '.'
+                       + df['Reverse_primer_number'])
+
+    #### Add primer sequence and barcode sequences from the catalog
+    fw_primers = catalog.sheet(fw_primer)
+    rv_primers = catalog.sheet(rv_primer)
+    df = pd.merge(
+        df,
+        fw_primers[['Forward_primer',
+                    'LinkerPrimerSequence',
+                    'Barcode_Forward_Primer']], on='Forward_primer', how='left')
+    # Also add the complement reverse of reverse primer barcode
+    df = pd.merge(
+        df,
+        rv_primers[['Reverse_primer',
+                    'ReversePrimer',
+                    'Barcode_Reverse_Primer',
+                    'RevComplBarcode_Reverse_Primer']].rename(
+            columns={'RevComplBarcode_Reverse_Primer':
+                     'RevComplReverseBarcodesequence'}),
+        on='Reverse_primer', how='left')
+
+    #### Construct BarcodeSequence (barcode_fwd + revcompl_barcode_rev)
+    df['BarcodeSequence'] = (df['Barcode_Forward_Primer']
+                             + df['RevComplReverseBarcodesequence'])
+
+    #### Assemble final mappingfile
+    mf = df[list(MAPPING_COLUMNS)].rename(columns=MAPPING_COLUMNS)
+
+    #### Add metadata from sample_file
+    metadata = list(sample_file.columns[2:])
+    mf[metadata] = sample_file[metadata]
+    # Remove everything after the description column
+    mf = mf.loc[:, :'Description']
+    check_mapping_file(mf)
+    return mf
+
+
+def check_mapping_file(mf):
+    """
+    Checks that every sample got a barcode and that no #SampleID or
+    BarcodeSequence (upper case) is used for more than one sample. Raises a
+    ValueError that lists all problems at once.
+    """
+    problems = []
+    missing = mf['BarcodeSequence'].isna()
+    if missing.any():
+        # a primer name can be empty in the template as well
+        names = mf.loc[missing, ['ForwardPrimerName', 'ReversePrimerName']
+                       ].fillna('?').astype(str)
+        problems.append('No barcode found in the primer lists for: ' + ', '.join(
+            names['ForwardPrimerName'] + '/' + names['ReversePrimerName']))
+    for column, values in (('#SampleID', mf['#SampleID']),
+                           ('BarcodeSequence',
+                            mf['BarcodeSequence'].str.upper())):
+        # duplicated() hashes every value once, so this is fast for any size
+        is_duplicate = values.duplicated(keep=False) & values.notna()
+        duplicated = [f'{value} ({samples})' for value, samples in
+                      mf.loc[is_duplicate, '#SampleID'].groupby(
+                          values[is_duplicate]).agg(', '.join).items()]
+        if duplicated:
+            problems.append(f'{column} used for more than one sample: '
+                            + '; '.join(duplicated))
+    if problems:
+        raise ValueError('\n'.join(problems))
+
+
+def create_mapping_file(file_path, folder_path, catalog, suffix=''):
+    """
+    Creates <NIOZnumber><suffix>_mapping_file.txt (and
+    <NIOZnumber><suffix>_README!.txt for an Excel template) in folder_path.
+    Returns the path of the mapping file.
+    """
+    sample_file, ReadMe, NIOZnumber = read_template(file_path)
+    mf = build_mapping_file(sample_file, NIOZnumber, catalog)
+    # Save file as RUNID_mapping_file.txt, tab delimited and without the index
+    name = NIOZnumber + suffix
+    output = os.path.join(folder_path, name + "_mapping_file.txt")
+    mf.to_csv(output, sep="\t", index=False)
+    # Save the ProjectInfo sheet as a .txt file next to the mapping file
+    if ReadMe is not None:
+        ReadMe.to_csv(os.path.join(folder_path, name + "_README!.txt"),
+                      sep="\t", index=False)
+    return output
+
+
+def find_templates(templates):
+    """
+    List of template files from a folder (all .xlsx/.xlsm/.csv files, except
+    open Excel lock files) or from a list of files/folders.
+    """
+    if isinstance(templates, str):
+        templates = [templates]
+    found = []
+    for template in templates:
+        if os.path.isdir(template):
+            found.extend(sorted(
+                path for path in glob.glob(os.path.join(template, '*'))
+                if path.endswith(TEMPLATE_EXTENSIONS)
+                and not os.path.basename(path).startswith('~$')))
+        else:
+            found.append(template)
+    return found
+
+
+def _init_worker(catalog):
+    _catalog['catalog'] = catalog
+
+
+def template_name(file_path):
+    """Name of a template file without the folder and extension."""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def _create_one(task):
+    # never raises, so one bad template doesn't stop the batch
+    file_path, folder_path = task
+    try:
+        output = create_mapping_file(file_path, folder_path,
+                                     _catalog['catalog'],
+                                     '_' + template_name(file_path))
+        return file_path, 'ok', output
+    except Exception as error:
+        return file_path, 'failed', f'{type(error).__name__}: {error}'
+
+
+def create_mapping_files(templates, folder_path, primer_lists, workers=1):
+    """
+    Creates the mapping files of all templates (a folder or a list of files)
+    in folder_path, with the primer catalog loaded once. Templates often
+    share a NIOZ number (e.g. one per primer set), so the files are named
+    <NIOZnumber>_<template name>_mapping_file.txt. Templates with the same
+    name (in different folders) would overwrite each other's files, those
+    fail without being processed. Returns a DataFrame with per template the
+    status ('ok' or 'failed') and the mapping file or the error.
+    """
+    catalog = PrimerCatalog(primer_lists)
+    found = find_templates(templates)
+    names = pd.Series([template_name(template).lower() for template in found],
+                      dtype=object)
+    same_name = names.duplicated(keep=False).tolist()
+    tasks = [(template, folder_path)
+             for template, same in zip(found, same_name) if not same]
+    if workers > 1 and len(tasks) > 1:
+        with Pool(min(workers, len(tasks)), _init_worker, (catalog,)) as pool:
+            done = pool.map(_create_one, tasks)
+    else:
+        _init_worker(catalog)
+        done = [_create_one(task) for task in tasks]
+    # report in the order of the templates
+    done = iter(done)
+    results = [(template, 'failed', 'another template has the same name, '
+                'their mapping_files would overwrite each other')
+               if same else next(done)
+               for template, same in zip(found, same_name)]
+    return pd.DataFrame(results, columns=['template', 'status', 'result'])
@@ -0,0 +1,278 @@
+"""
+2-bit packed storage of many DNA sequences
+
+A python string costs about 50 bytes plus 1 byte per base. PackedSequences
+stores A, C, G and T in 2 bits (4 bases per byte) in one NumPy array, with an
+offsets array for the variable lengths. Other characters (N and the IUPAC
+codes) are stored as exceptions: their position and character are kept
+separately and restored when the sequence is read back.
+
+Every sequence starts at a byte boundary, so two sequences can be compared
+on their packed bytes (4 bases at a time), e.g. for the Hamming distance.
+distances.py keeps a barcode library and its reverse complements this way.
+
+    packed = PackedSequences.from_strings(['ACGTN', 'ACGA'])
+    packed[0]                          # 'ACGTN'
+    packed.reverse_complement()[1]     # 'TCGT'
+    packed.truncate(3).to_strings()    # ['ACG', 'ACG']
+"""
+from itertools import islice
+
+import numpy as np
+
+# 2 bit codes: A=0, C=1, G=2, T=3 (so the complement of a code is 3 - code)
+DECODE = np.frombuffer(b'ACGT', dtype=np.uint8)
+ENCODE = np.zeros(256, dtype=np.uint8)
+IS_EXCEPTION = np.ones(256, dtype=bool)
+for _code, _base in enumerate('ACGT'):
+    for _char in (_base, _base.lower()):
+        ENCODE[ord(_char)] = _code
+        IS_EXCEPTION[ord(_char)] = False
+
+# Complement of the IUPAC characters that are stored as exceptions
+IUPAC_COMPLEMENT = bytes.maketrans(b'NRYSWKMBDHVnryswkmbdhv-.',
+                                   b'NYRSWMKVHDBnyrswmkvhdb-.')
+
+# Number of sequences that are packed at once by from_strings
+CHUNK_SIZE = 100000
+
+
+def _pack_codes(codes, lengths):
+    """Packs 2 bit codes (concatenated sequences) into byte aligned data."""
+    padded = (lengths + 3) // 4 * 4
+    starts = np.cumsum(padded) - padded
+    seq_starts = np.cumsum(lengths) - lengths
+    # position of every base in the padded array
+    target = np.repeat(starts - seq_starts, lengths) + np.arange(codes.size)
+    full = np.zeros(int(padded.sum()), dtype=np.uint8)
+    full[target] = codes
+    full = full.reshape(-1, 4)
+    return (full[:, 0] << 6 | full[:, 1] << 4 | full[:, 2] << 2
+            | full[:, 3]).astype(np.uint8)
+
+
+class PackedSequences:
+    """
+    Immutable collection of DNA sequences in 2-bit packed form.
+
+    data            uint8 array with the packed bases
+    offsets         byte offset of every sequence in data (length n + 1)
+    lengths         number of bases of every sequence
+    starts          position of every sequence in the concatenated
+                    sequences (length n + 1)
+    exc_positions   position (in the concatenated sequences) of exceptions
+    exc_chars       the character at each exception position
+    exc_offsets     index of the first exception of every sequence in
+                    exc_positions (length n + 1)
+    """
+    __slots__ = ('data', 'offsets', 'lengths', 'starts', 'exc_positions',
+                 'exc_chars', 'exc_offsets')
+
+    def __init__(self, data, lengths, exc_positions, exc_chars):
+        self.data = data
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.concatenate(
+            ([0], np.cumsum((self.lengths + 3) // 4))).astype(np.int64)
+        self.starts = np.concatenate(
+            ([0], np.cumsum(self.lengths))).astype(np.int64)
+        self.exc_positions = exc_positions
+        self.exc_chars = exc_chars
+        # exc_positions is sorted, so the exceptions of sequence i are
+        # exc_positions[exc_offsets[i]:exc_offsets[i + 1]]
+        self.exc_offsets = np.searchsorted(exc_positions, self.starts)
+
+    @classmethod
+    def from_strings(cls, sequences):
+        """Packs an iterable of sequence strings."""
+        sequences = iter(sequences)
+        parts = []
+        while True:
+            chunk = list(islice(sequences, CHUNK_SIZE))
+            if not chunk:
+                break
+            parts.append(cls._from_chunk(chunk))
+        if not parts:
+            return cls._from_chunk([])
+        if len(parts) == 1:
+            return parts[0]
+        bases = np.cumsum([0] + [int(p.lengths.sum()) for p in parts[:-1]])
+        return cls(np.concatenate([p.data for p in parts]),
+                   np.concatenate([p.lengths for p in parts]),
+                   np.concatenate([p.exc_positions + base
+                                   for p, base in zip(parts, bases)]),
+                   np.concatenate([p.exc_chars for p in parts]))
+
+    @classmethod
+    def _from_chunk(cls, sequences):
+        raw = np.frombuffer(''.join(sequences).encode('ascii'),
+                            dtype=np.uint8)
+        lengths = np.fromiter(map(len, sequences), dtype=np.int64,
+                              count=len(sequences))
+        exc_positions = np.flatnonzero(IS_EXCEPTION[raw])
+        return cls(_pack_codes(ENCODE[raw], lengths), lengths,
+                   exc_positions, raw[exc_positions].copy())
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def nbytes(self):
+        """Memory used by the arrays in bytes."""
+        return sum(array.nbytes for array in (
+            self.data, self.offsets, self.lengths, self.starts,
+            self.exc_positions, self.exc_chars, self.exc_offsets))
+
+    def _unpacked_codes(self):
+        # 2 bit codes of all sequences, concatenated (without padding)
+        codes = np.stack([self.data >> 6, (self.data >> 4) & 3,
+                          (self.data >> 2) & 3, self.data & 3],
+                         axis=1).ravel()
+        valid = np.repeat(self.offsets[:-1] * 4 - (
+            np.cumsum(self.lengths) - self.lengths), self.lengths)
+        return codes[valid + np.arange(int(self.lengths.sum()))]
+
+    def code_matrix(self, fill=4):
+        """
+        (n x longest sequence) uint8 matrix with the 2 bit code of every base.
+        The positions after the end of a sequence get fill. Exceptions get the
+        code they were packed with (A), check exc_positions first if that
+        matters.
+        """
+        width = int(self.lengths.max()) if len(self) else 0
+        matrix = np.full((len(self), width), fill, dtype=np.uint8)
+        matrix[np.arange(width) < self.lengths[:, None]] = \
+            self._unpacked_codes()
+        return matrix
+
+    def words(self):
+        """
+        The packed bytes of every sequence as a row of 64 bit words, for
+        comparing whole sequences with XOR. All sequences must have the same
+        length.
+        """
+        if len(set(self.lengths.tolist())) > 1:
+            raise ValueError('words needs sequences of the same length')
+        per_sequence = int(self.offsets[1]) if len(self) else 0
+        rows = np.zeros((len(self), -(-per_sequence // 8) * 8),
+                        dtype=np.uint8)
+        rows[:, :per_sequence] = self.data.reshape(len(self), per_sequence)
+        return rows.view(np.uint64)
+
+    def _chars(self):
+        chars = DECODE[self._unpacked_codes()]
+        chars[self.exc_positions] = self.exc_chars
+        return chars
+
+    def to_strings(self):
+        """List with all sequences as (upper case) strings."""
+        text = self._chars().tobytes().decode('ascii')
+        ends = np.cumsum(self.lengths).tolist()
+        return [text[end - length:end]
+                for end, length in zip(ends, self.lengths.tolist())]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        length = int(self.lengths[i])
+        block = self.data[self.offsets[i]:self.offsets[i + 1]]
+        codes = np.stack([block >> 6, (block >> 4) & 3, (block >> 2) & 3,
+                          block & 3], axis=1).ravel()[:length]
+        chars = DECODE[codes]
+        start = self.starts[i]
+        lo, hi = self.exc_offsets[i], self.exc_offsets[i + 1]
+        chars[self.exc_positions[lo:hi] - start] = self.exc_chars[lo:hi]
+        return chars.tobytes().decode('ascii')
+
+    def __iter__(self):
+        return iter(self.to_strings())
+
+    def _exceptions_of(self, i):
+        start = self.starts[i]
+        lo, hi = self.exc_offsets[i], self.exc_offsets[i + 1]
+        return dict(zip((self.exc_positions[lo:hi] - start).tolist(),
+                        self.exc_chars[lo:hi].tolist()))
+
+    def truncate(self, length):
+        """New PackedSequences with every sequence cut to length bases."""
+        lengths = np.minimum(self.lengths, length)
+        starts = np.cumsum(self.lengths) - self.lengths
+        keep = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + \
+            np.arange(int(lengths.sum()))
+        codes = self._unpacked_codes()[keep]
+        # new position of the exceptions that are kept
+        new_position = np.full(int(self.lengths.sum()), -1, dtype=np.int64)
+        new_position[keep] = np.arange(keep.size)
+        exc_new = new_position[self.exc_positions]
+        kept = exc_new >= 0
+        return PackedSequences(_pack_codes(codes, lengths), lengths,
+                               exc_new[kept], self.exc_chars[kept])
+
+    def reverse_complement(self):
+        """New PackedSequences with the reverse complement of every sequence."""
+        total = int(self.lengths.sum())
+        ends = np.cumsum(self.lengths)
+        starts = ends - self.lengths
+        # position i of a sequence moves to position length - 1 - i
+        mirror = np.repeat(starts + ends - 1, self.lengths) - \
+            np.arange(total)
+        codes = 3 - self._unpacked_codes()[mirror]
+        exc_positions = mirror[self.exc_positions]
+        order = np.argsort(exc_positions)
+        exc_chars = np.frombuffer(
+            self.exc_chars.tobytes().translate(IUPAC_COMPLEMENT),
+            dtype=np.uint8)
+        return PackedSequences(_pack_codes(codes.astype(np.uint8),
+                                           self.lengths), self.lengths,
+                               exc_positions[order], exc_chars[order].copy())
+
+    def equal(self, i, j):
+        """True if sequence i and j are identical (compared packed)."""
+        if self.lengths[i] != self.lengths[j]:
+            return False
+        a = self.data[self.offsets[i]:self.offsets[i + 1]]
+        b = self.data[self.offsets[j]:self.offsets[j + 1]]
+        return bool(np.array_equal(a, b)) and \
+            self._exceptions_of(i) == self._exceptions_of(j)
+
+    def hamming(self, i, j):
+        """
+        Number of positions where sequence i and j differ. Both must have the
+        same length. The packed bytes are compared 4 bases at a time, the
+        (rare) exception positions are checked separately.
+        """
+        if self.lengths[i] != self.lengths[j]:
+            raise ValueError('Hamming distance needs sequences of the same '
+                             'length')
+        a = self.data[self.offsets[i]:self.offsets[i + 1]]
+        b = self.data[self.offsets[j]:self.offsets[j + 1]]
+        x = a ^ b
+        # one bit per differing base, then count the bits
+        distance = int(np.unpackbits((x | x >> 1) & 0x55).sum())
+        exc_i, exc_j = self._exceptions_of(i), self._exceptions_of(j)
+        for position in exc_i.keys() | exc_j.keys():
+            shift = 6 - 2 * (position % 4)
+            same_code = ((a[position // 4] >> shift) & 3) == \
+                ((b[position // 4] >> shift) & 3)
+            same_char = exc_i.get(position) == exc_j.get(position)
+            distance += int(same_code) - int(same_char)
+        return distance
+
+
+def read_packed_fasta(path):
+    """
+    Reads a (gzipped) FASTA file into a list of headers and PackedSequences,
+    without keeping all sequences as strings at the same time.
+    """
+    from moltools.fasta import read_fasta
+    from moltools.seqfile import open_seqfile
+
+    headers = []
+
+    def sequences(records):
+        for header, sequence in records:
+            headers.append(header)
+            yield sequence
+
+    with open_seqfile(path) as data:
+        packed = PackedSequences.from_strings(sequences(read_fasta(data)))
+    return headers, packed
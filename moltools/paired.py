@@ -0,0 +1,107 @@
+"""
+Paired-end processing of forward/reverse FASTQ files
+
+The forward (e.g. 515F) and reverse (e.g. 926R) files are read in lockstep,
+one batch of reads from each file at a time, so both files are read only once
+and the memory use stays constant. The read names of the mates are checked,
+and filtering always keeps or removes both mates of a pair.
+"""
+from itertools import islice
+
+import numpy as np
+
+from moltools.fastq import (BATCH_SIZE, FastqBatch, read_fastq, trim_batch,
+                            write_fastq)
+from moltools.iupac import primer_positions
+from moltools.seqfile import open_seqfile
+
+
+def pair_id(header):
+    """Read name without the mate number (' 1:N:0...' or '/1')."""
+    name = header.split(None, 1)[0] if header else ''
+    if name.endswith(('/1', '/2')):
+        name = name[:-2]
+    return name
+
+
+def read_pairs(fwd_handle, rev_handle):
+    """
+    Generator that yields (forward, reverse) FastqRecords from two opened
+    FASTQ files. Raises a ValueError when the read names don't match or one
+    file has more reads than the other.
+    """
+    fwd_reads = read_fastq(fwd_handle)
+    rev_reads = read_fastq(rev_handle)
+    for fwd in fwd_reads:
+        rev = next(rev_reads, None)
+        if rev is None:
+            raise ValueError('The reverse file has less reads than the '
+                             f'forward file (first missing: {fwd.id})')
+        if pair_id(fwd.header) != pair_id(rev.header):
+            raise ValueError('Forward and reverse reads are not in the same '
+                             f'order: {fwd.id} and {rev.id}')
+        yield fwd, rev
+    rev = next(rev_reads, None)
+    if rev is not None:
+        raise ValueError('The forward file has less reads than the reverse '
+                         f'file (first extra: {rev.id})')
+
+
+def read_pair_batches(fwd_handle, rev_handle, batch_size=BATCH_SIZE):
+    """Generator that yields (forward, reverse) FastqBatches."""
+    pairs = read_pairs(fwd_handle, rev_handle)
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return
+        yield (FastqBatch.from_records(fwd for fwd, rev in batch),
+               FastqBatch.from_records(rev for fwd, rev in batch))
+
+
+def _primer_ends(batch, primer, max_mismatches, max_shift):
+    # position after the primer in every read, -1 if it was not found
+    if not primer:
+        return np.zeros(len(batch), dtype=np.int64)
+    positions = primer_positions(batch.sequences, primer, max_mismatches,
+                                 max_shift)
+    return np.where(positions >= 0, positions + len(primer), -1)
+
+
+def trim_pairs(fwd_in, rev_in, fwd_out, rev_out, threshold=None,
+               length=None, rev_length=None, min_length=0, threads=1,
+               batch_size=BATCH_SIZE, primer=None, rev_primer=None,
+               primer_mismatches=0, primer_shift=0):
+    """
+    Quality trims (threshold) and/or truncates the forward reads to length
+    and the reverse reads to rev_length (same as length if None). Pairs where
+    one of the mates is shorter than min_length are removed. If (degenerate)
+    primers are given, the forward primer is removed from the forward reads
+    and the reverse primer from the reverse reads, pairs where one of them is
+    not found are removed. All files may be gzipped. Returns a dictionary
+    with the number of pairs before and after.
+    """
+    if rev_length is None:
+        rev_length = length
+    counts = dict(pairs_in=0, pairs_out=0)
+    with open_seqfile(fwd_in) as fwd_data, open_seqfile(rev_in) as rev_data, \
+            open_seqfile(fwd_out, 'wt', threads=threads) as fwd_output, \
+            open_seqfile(rev_out, 'wt', threads=threads) as rev_output:
+        for fwd, rev in read_pair_batches(fwd_data, rev_data, batch_size):
+            counts['pairs_in'] += len(fwd)
+            if primer or rev_primer:
+                fwd_starts = _primer_ends(fwd, primer, primer_mismatches,
+                                          primer_shift)
+                rev_starts = _primer_ends(rev, rev_primer, primer_mismatches,
+                                          primer_shift)
+                keep = (fwd_starts >= 0) & (rev_starts >= 0)
+                fwd = fwd.select(keep).trim_start(fwd_starts[keep])
+                rev = rev.select(keep).trim_start(rev_starts[keep])
+            fwd = trim_batch(fwd, threshold, length)
+            rev = trim_batch(rev, threshold, rev_length)
+            if min_length:
+                keep = (fwd.lengths >= min_length) & (rev.lengths >= min_length)
+                fwd = fwd.select(keep)
+                rev = rev.select(keep)
+            counts['pairs_out'] += write_fastq(fwd.records(), fwd_output)
+            write_fastq(rev.records(), rev_output)
+    return counts
@@ -0,0 +1,104 @@
+"""
+Compiled primer catalog
+
+Opening primer_lists.xlsx with openpyxl is slow, certainly on the network
+share. PrimerCatalog reads all sheets of the workbook once, adds the reverse
+complement of every barcode (column 'RevComplBarcode_Forward_Primer' or
+'RevComplBarcode_Reverse_Primer') and saves the result as a pickle file next
+to the workbook. Later runs load the pickle, unless the
+workbook has been changed (modification time, or hash if that changed).
+
+    catalog = PrimerCatalog('primer_lists.xlsx')
+    fw_primers = catalog.sheet('515F_Golay')
+"""
+import os
+import pickle
+
+import pandas as pd
+
+from moltools.cache import file_signature, is_unchanged
+from moltools.revcomp import reverse_complement_column
+
+# Version of the layout of the cache file, a different version is rebuilt
+CATALOG_VERSION = 2
+
+# Column with the barcode in the forward and reverse primer sheets -> column
+# with its reverse complement
+BARCODE_COLUMNS = {
+    'Barcode_Forward_Primer': 'RevComplBarcode_Forward_Primer',
+    'Barcode_Reverse_Primer': 'RevComplBarcode_Reverse_Primer',
+}
+
+
+def compile_sheets(workbook):
+    """
+    Reads all sheets of the workbook and adds the reverse complement of every
+    barcode column that a sheet has (see BARCODE_COLUMNS).
+    """
+    sheets = pd.read_excel(workbook, sheet_name=None, engine='openpyxl')
+    for sheet in sheets.values():
+        for column, revcompl_column in BARCODE_COLUMNS.items():
+            if column in sheet.columns:
+                sheet[revcompl_column] = reverse_complement_column(
+                    sheet[column])
+    return sheets
+
+
+class PrimerCatalog:
+    """All primer sheets of a workbook, cached in a pickle file."""
+
+    def __init__(self, workbook, cache_path=None):
+        self.workbook = workbook
+        self.cache_path = cache_path or workbook + '.catalog.pkl'
+        self.sheets = self._load()
+
+    def _load(self):
+        cache = self._read_cache()
+        if cache is None:
+            return self.rebuild()
+        mtime = file_signature(self.workbook, False)['mtime']
+        if cache['signature'].get('mtime') != mtime:
+            # the workbook was touched or copied, but the contents are the same
+            self._save(cache['sheets'])
+        return cache['sheets']
+
+    def _read_cache(self):
+        # the cache if it is up to date, else None
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            if (cache.get('version') == CATALOG_VERSION
+                    and is_unchanged(self.workbook, cache['signature'])):
+                return cache
+        except Exception:
+            # a cache that can't be read (damaged, or pickled with another
+            # version of pandas or numpy) is rebuilt
+            pass
+        return None
+
+    def rebuild(self):
+        """Reads the workbook again and rewrites the cache file."""
+        sheets = compile_sheets(self.workbook)
+        self._save(sheets)
+        return sheets
+
+    def _save(self, sheets):
+        cache = {'version': CATALOG_VERSION,
+                 'signature': file_signature(self.workbook),
+                 'sheets': sheets}
+        with open(self.cache_path, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __contains__(self, name):
+        return name in self.sheets
+
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def sheet(self, name):
+        """A copy of one sheet (e.g. '515F_Golay') as a DataFrame."""
+        if name not in self.sheets:
+            raise KeyError(f'{name} is not a sheet of {self.workbook}')
+        return self.sheets[name].copy()
@@ -0,0 +1,72 @@
+"""
+qPCR plates (CFX exports)
+
+All plates of a batch are read into one DataFrame, with the plate number (or
+name) in the column 'plate'. Steps that are done per plate (e.g. the normalization on
+the sample_mix) are done with a groupby over that column, so the number of
+plates doesn't matter.
+"""
+import numpy as np
+import pandas as pd
+
+
+def read_plates(paths, names=None, **read_csv_options):
+    """
+    Reads the .csv exports of several plates and concatenates them once. The
+    plates are numbered 1, 2, ... in the order of paths, or get the names
+    given.
+    """
+    if names is None:
+        names = range(1, len(paths) + 1)
+    return pd.concat(
+        [pd.read_csv(path, **read_csv_options).assign(plate=name)
+         for name, path in zip(names, paths)],
+        ignore_index=True)
+
+
+def plate_offsets(data, is_mix, reference_plate, cq='Cq'):
+    """
+    Series plate -> mean Cq of the sample_mix (rows where is_mix is True) on
+    that plate minus the mean Cq of the sample_mix on the reference plate.
+    Plates without a sample_mix get 0, all plates get 0 if the reference
+    plate has no sample_mix.
+    """
+    means = data.loc[is_mix].groupby('plate')[cq].mean()
+    offsets = means - means.get(reference_plate, np.nan)
+    return offsets.reindex(data['plate'].unique()).fillna(0)
+
+
+def normalize_plates(data, is_mix, reference_plate, cq='Cq',
+                     corrected='corrected Cq'):
+    """
+    Adds the column corrected: the Cq values shifted by the sample_mix offset
+    of their plate (see plate_offsets), in one column operation.
+    """
+    offsets = plate_offsets(data, is_mix, reference_plate, cq)
+    data[corrected] = data[cq] - data['plate'].map(offsets)
+    return data
+
+
+def replicate_table(data, value, by='Sample', prefix=None, skipna=True):
+    """
+    Wide table with one row per sample (index by): the values of the
+    replicates in the columns prefix1, prefix2, ... (as many as the sample
+    with the most replicates, prefix defaults to value) and their mean, stdev
+    (n-1) and CV% (stdev / mean * 100). Missing values (e.g. no Cq) get a
+    column, but are left out of the statistics, unless skipna is False: then
+    the statistics of that sample are NaN. Rows without a value in by (e.g.
+    wells without a sample name) are left out.
+    """
+    prefix = value if prefix is None else prefix
+    # wells without a sample name (or plate) don't belong to any sample
+    data = data[data[by].notna()]
+    replicate = (data.groupby(by).cumcount() + 1).astype(int)
+    table = data.set_index([data[by], replicate])[value].unstack()
+    table.columns = [f'{prefix}{number}' for number in table.columns]
+    stats = data.groupby(by)[value].agg(['mean', 'std'])
+    if not skipna:
+        stats.loc[data[value].isna().groupby(data[by]).any()] = np.nan
+    table['mean'] = stats['mean']
+    table['stdev'] = stats['std']
+    table['CV%'] = stats['std'] / stats['mean'] * 100
+    return table
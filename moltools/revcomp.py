@@ -0,0 +1,82 @@
+"""
+Reverse complement of barcodes and primers
+
+reverse_complement_column() does a whole column (list, array or pandas
+Series) at once: all sequences are joined into one string, translated with
+one complement table and reversed in one go. This is much faster than making
+a Bio.Seq object per barcode, and returns plain strings. IUPAC codes are
+complemented as well, the case of the letters is kept.
+"""
+import pandas as pd
+
+# Complement of every (IUPAC) base, upper and lower case
+COMPLEMENT = str.maketrans('ACGTUNRYSWKMBDHVacgtunryswkmbdhv',
+                           'TGCAANYRSWMKVHDBtgcaanyrswmkvhdb')
+
+# Separator between the joined sequences, can't be part of a sequence
+_SEPARATOR = '\n'
+
+
+def reverse_complement(sequence):
+    """Reverse complement of one sequence."""
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def reverse_complement_column(sequences):
+    """
+    Reverse complement of every sequence in a list, array or Series. Missing
+    values (NaN/None) stay missing. A Series is returned for a Series (with
+    the same index), a list for everything else.
+    """
+    values = list(sequences)
+    missing = [not isinstance(value, str) for value in values]
+    if any(missing):
+        strings = ['' if m else value for value, m in zip(values, missing)]
+    else:
+        strings = values
+    # reversing the joined string reverses every sequence and their order
+    joined = _SEPARATOR.join(strings).translate(COMPLEMENT)[::-1]
+    result = joined.split(_SEPARATOR)[::-1] if strings else []
+    if any(missing):
+        result = [None if m else value for value, m in zip(result, missing)]
+    if isinstance(sequences, pd.Series):
+        return pd.Series(result, index=sequences.index, dtype=object,
+                         name=sequences.name)
+    return result
+
+
+def find_revcomp_matches(barcodes, iupac=False):
+    """
+    For every barcode, the positions of all other barcodes that are equal to
+    its reverse complement (case insensitive). A barcode that is its own
+    reverse complement (palindrome) is not listed as its own match.
+    One pass with a dictionary barcode -> positions, so this scales linearly.
+    With iupac=True, barcodes with degenerate bases (N, R, Y, ...) are also
+    compared base by base with bit masks, so e.g. ACGN matches NCGT.
+    """
+    barcodes = [b.upper() if isinstance(b, str) else None for b in barcodes]
+    positions = {}
+    for i, barcode in enumerate(barcodes):
+        if barcode is not None:
+            positions.setdefault(barcode, []).append(i)
+    rcs = reverse_complement_column(barcodes)
+    matches = [[j for j in positions.get(rc, ()) if j != i]
+               for i, rc in enumerate(rcs)]
+    if iupac:
+        from moltools.iupac import degenerate_matches, is_degenerate
+
+        degenerate = [i for i, barcode in enumerate(barcodes)
+                      if barcode is not None and is_degenerate(barcode)]
+        strings = [barcode or '' for barcode in barcodes]
+        found = degenerate_matches([rcs[i] for i in degenerate], strings)
+        # a match is symmetric, so add it to both barcodes
+        for i, js in zip(degenerate, found):
+            for j in js:
+                if j != i:
+                    if j not in matches[i]:
+                        matches[i].append(j)
+                    if i not in matches[j]:
+                        matches[j].append(i)
+        matches = [sorted(js) for js in matches]
+    return matches
+
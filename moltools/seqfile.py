@@ -0,0 +1,131 @@
+"""
+Opening of (compressed) sequence files
+
+open_seqfile() can be used instead of open() for FASTA and FASTQ files.
+- Reading: gzip (and bgzip) compressed files are detected by their first bytes,
+  so the file name does not matter and nothing is decompressed to disk.
+- Writing: files ending in .gz or .bgz are written in the BGZF format (the
+  blocked gzip used by bgzip/samtools). This is a normal gzip file that every
+  tool can read, but the blocks can be compressed on several threads at once.
+"""
+import io
+import gzip
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Size of the read/write buffers in bytes
+BUFFER_SIZE = 1024 * 1024
+
+# Maximum amount of uncompressed data per BGZF block (same as bgzip)
+BGZF_BLOCK_SIZE = 0xff00
+
+# Empty block that marks the end of a BGZF file
+BGZF_EOF = bytes.fromhex(
+    '1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Text files are read as utf-8. Bytes that are not valid utf-8 (e.g. a latin-1
+# character in a header or taxonomy) are kept as they are and written back
+# unchanged, instead of raising an error
+ENCODING = 'utf-8'
+ERRORS = 'surrogateescape'
+
+
+def is_gzipped(path):
+    """Checks the first two bytes of a file for the gzip signature."""
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def compress_bgzf_block(data, level=6):
+    """Compresses up to BGZF_BLOCK_SIZE bytes into one complete BGZF block."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    # header (18 bytes) + deflated data + crc32 and size (8 bytes)
+    block_size = 18 + len(deflated) + 8
+    header = (b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00'
+              + struct.pack('<H', block_size - 1))
+    trailer = struct.pack('<II', zlib.crc32(data), len(data))
+    return header + deflated + trailer
+
+
+class BgzfWriter(io.RawIOBase):
+    """
+    Binary file object that writes BGZF. Full blocks are compressed on a pool
+    of threads (zlib releases the GIL) and written to disk in their original
+    order. At most a few blocks per thread are kept in memory.
+    """
+
+    def __init__(self, path, threads=1, level=6, mode='wb'):
+        self._file = open(path, mode)
+        self._level = level
+        self._buffer = bytearray()
+        self._pool = ThreadPoolExecutor(threads) if threads > 1 else None
+        self._pending = deque()
+        self._max_pending = 4 * max(threads, 1)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= BGZF_BLOCK_SIZE:
+            block = bytes(self._buffer[:BGZF_BLOCK_SIZE])
+            del self._buffer[:BGZF_BLOCK_SIZE]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block):
+        if self._pool is None:
+            self._file.write(compress_bgzf_block(block, self._level))
+            return
+        self._pending.append(
+            self._pool.submit(compress_bgzf_block, block, self._level))
+        while len(self._pending) > self._max_pending:
+            self._file.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._file.write(self._pending.popleft().result())
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._file.write(BGZF_EOF)
+        self._file.close()
+        super().close()
+
+
+def open_seqfile(path, mode='rt', threads=1, level=6):
+    """
+    Opens a sequence file for reading ('rt'/'rb'), writing ('wt'/'wb') or
+    appending ('at'/'ab'). Compressed input is detected automatically. Output
+    is compressed as BGZF when the file name ends in .gz or .bgz, using
+    'threads' compression threads. Appending to a compressed file adds new
+    gzip blocks, which gives a normal (multi-member) gzip file.
+    """
+    text = 'b' not in mode
+    if mode[0] == 'r':
+        if is_gzipped(path):
+            handle = io.BufferedReader(gzip.open(path, 'rb'), BUFFER_SIZE)
+        else:
+            handle = open(path, 'rb', buffering=BUFFER_SIZE)
+    elif mode[0] in 'wa':
+        if str(path).endswith(('.gz', '.bgz')):
+            handle = io.BufferedWriter(
+                BgzfWriter(path, threads, level, mode[0] + 'b'), BUFFER_SIZE)
+        else:
+            handle = open(path, mode[0] + 'b', buffering=BUFFER_SIZE)
+    else:
+        raise ValueError(
+            f"mode must start with 'r', 'w' or 'a', not {mode!r}")
+    if text:
+        return io.TextIOWrapper(handle, encoding=ENCODING, errors=ERRORS,
+                                newline=None)
+    return handle
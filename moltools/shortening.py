@@ -0,0 +1,139 @@
+"""
+Shortening of ASV sequences for alignment
+
+Used by 'FASTA shortening/shortening of sequences.py'. Every record gets the
+domain and the NIOZ number added to the header, the sequence is cut to a fixed
+length and (optionally) a poly-A tail is added.
+
+If only a subset of the ASVs is needed, those records are read with the .fai
+index (see faidx.py) instead of reading the whole file.
+
+Optionally, identical shortened sequences are dereplicated (see derep.py).
+
+With workers > 1 the input is split into chunks of complete records that are
+shortened on a pool of processes. The output is written in the original order.
+"""
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+from moltools.derep import dereplicate
+from moltools.faidx import FastaIndex
+from moltools.fasta import (FastaRecord, fasta_chunks, read_fasta,
+                            read_fasta_chunk, write_fasta)
+from moltools.seqfile import ENCODING, ERRORS, is_gzipped, open_seqfile
+
+# Number of records per batch when a gzipped file is shortened in parallel
+# (a gzipped file can't be split in byte chunks)
+BATCH_RECORDS = 50000
+
+# Number of chunks per worker that are read ahead while shortening in parallel
+PENDING_PER_WORKER = 2
+
+# Settings shared by all records, set once per worker process
+_settings = {}
+
+
+def shorten_record(header, sequence, taxonomies, NIOZ, length=50, tail=''):
+    """
+    Returns the shortened FastaRecord of one record. The ASV number is the
+    first word of the header. If the ASV is not in the taxonomies dictionary,
+    'unknown' is used as domain.
+    """
+    header = header.strip()
+    ASV = header.split(None, 1)[0] if header else ''
+    domain = taxonomies.get(ASV, 'unknown')
+    return FastaRecord(header + '_' + domain + '_' + NIOZ,
+                       sequence[:length] + tail)
+
+
+def shorten_records(records, taxonomies, NIOZ, length=50, tail=''):
+    """
+    Generator that shortens a stream of records (FastaRecords or
+    (header, sequence) tuples).
+    """
+    for header, sequence in records:
+        yield shorten_record(header, sequence, taxonomies, NIOZ, length, tail)
+
+
+def _init_worker(taxonomies, NIOZ, length, tail):
+    # the taxonomies are sent once per process instead of once per chunk
+    _settings.update(taxonomies=taxonomies, NIOZ=NIOZ, length=length,
+                     tail=tail)
+
+
+def _shorten_chunk(chunk):
+    # chunk is a (path, start, end) byte range or a list of (header, sequence)
+    if isinstance(chunk, tuple):
+        chunk = read_fasta_chunk(*chunk)
+    return list(shorten_records(chunk, **_settings))
+
+
+def _record_batches(path):
+    with open_seqfile(path) as data:
+        records = read_fasta(data)
+        while True:
+            batch = [tuple(record)
+                     for record in islice(records, BATCH_RECORDS)]
+            if not batch:
+                return
+            yield batch
+
+
+def _shorten_parallel(in_path, taxonomies, NIOZ, length, tail, workers):
+    """Generator that yields the shortened records, shortened in parallel."""
+    if is_gzipped(in_path):
+        chunks = _record_batches(in_path)
+    else:
+        chunks = ((in_path, start, end)
+                  for start, end in fasta_chunks(in_path))
+    with Pool(workers, _init_worker, (taxonomies, NIOZ, length, tail)) as pool:
+        # at most PENDING_PER_WORKER chunks per worker are read ahead, the
+        # oldest one is written before the next is read (Pool.imap would read
+        # the whole input ahead and queue all results)
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_shorten_chunk, (chunk,)))
+            if len(pending) >= PENDING_PER_WORKER * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def shorten_fasta(in_path, out_path, taxonomies, NIOZ, length=50, tail='',
+                  threads=1, workers=1, derep_table=None, subset=None):
+    """
+    Streams the records of in_path through the shortening and writes them to
+    out_path. Both files may be gzipped. With workers > 1 the shortening is
+    done on that many processes. If derep_table is a path, identical shortened
+    sequences are written once (with ';size=') and the table with the
+    original and dereplicated headers is saved there. If subset is a list of
+    ASV numbers, only those records are shortened (in that order, ASVs that
+    are not in the file are skipped); in_path must then be uncompressed.
+    Returns the number of records written.
+
+    On Windows, call this from within an  if __name__ == '__main__':  block
+    when workers > 1.
+    """
+    if subset is not None:
+        with FastaIndex(in_path) as index:
+            shortened = shorten_records(index.records(subset, missing='skip'),
+                                        taxonomies, NIOZ, length, tail)
+            return _write(shortened, out_path, threads, derep_table)
+    if workers > 1:
+        shortened = _shorten_parallel(in_path, taxonomies, NIOZ, length, tail,
+                                      workers)
+        return _write(shortened, out_path, threads, derep_table)
+    with open_seqfile(in_path) as data:
+        shortened = shorten_records(read_fasta(data), taxonomies, NIOZ,
+                                    length, tail)
+        return _write(shortened, out_path, threads, derep_table)
+
+
+def _write(records, out_path, threads, derep_table):
+    if derep_table is None:
+        return write_fasta(records, out_path, threads=threads)
+    with open(derep_table, 'w', buffering=1024 * 1024, encoding=ENCODING,
+              errors=ERRORS) as map_handle:
+        records = dereplicate(records, map_handle)
+    return write_fasta(records, out_path, threads=threads)
@@ -0,0 +1,84 @@
+"""
+Standard curves
+
+A straight line through the standards, used to go from a measured signal to a
+quantity and back:
+- qPCR:  Cq = slope * log10(copies) + intercept  (log=True)
+- Qubit: RFU = slope * ng + intercept            (log=False)
+
+fit_curve() keeps every fit it made, keyed by a hash of the standards, so
+fitting the same standards again (e.g. when points are excluded and included
+again) doesn't redo the regression.
+"""
+import hashlib
+
+import numpy as np
+from scipy import stats
+
+# Fits made by fit_curve(), hash of the standards -> StandardCurve
+_fits = {}
+
+
+def standard_powers(samples):
+    """Powers of the standards from names like 10^3 or Std^3, as floats."""
+    return samples.str.split('^', n=1).str[1].astype(float)
+
+
+class StandardCurve:
+    """
+    Linear regression of y (signal) on x (the log10 of the quantity if log is
+    True, else the quantity itself). x and y should not contain missing
+    values. Has the slope, intercept, R², efficiency (only for log curves,
+    else None) and residuals (y minus the line) of the fit.
+    """
+    __slots__ = ('x', 'y', 'log', 'slope', 'intercept', 'r2', 'efficiency',
+                 'residuals')
+
+    def __init__(self, x, y, log=True):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.log = log
+        fit = stats.linregress(self.x, self.y)
+        self.slope = fit.slope
+        self.intercept = fit.intercept
+        self.r2 = fit.rvalue ** 2
+        self.efficiency = (-1 + 10 ** (-1 / self.slope)) * 100 if log else None
+        self.residuals = self.y - (self.intercept + self.slope * self.x)
+
+    def quantity(self, signal):
+        """Quantity (e.g. copies/µL or ng) for one signal or a whole array."""
+        x = (signal - self.intercept) / self.slope
+        return 10 ** x if self.log else x
+
+    def signal(self, quantity):
+        """Expected signal (e.g. Cq) for one quantity or a whole array."""
+        x = np.log10(quantity) if self.log else quantity
+        return self.intercept + self.slope * x
+
+    def line(self, num=500):
+        """x and y of the fitted line over the range of the standards."""
+        x = np.linspace(np.min(self.x), np.max(self.x), num=num)
+        return x, self.intercept + self.slope * x
+
+    def __repr__(self):
+        return (f'StandardCurve(slope={self.slope:.3f}, '
+                f'intercept={self.intercept:.2f}, r2={self.r2:.4f})')
+
+
+def standards_hash(x, y, log=True):
+    """sha1 of the standards data (x, y and the kind of curve)."""
+    digest = hashlib.sha1(b'log' if log else b'linear')
+    digest.update(np.ascontiguousarray(x, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def fit_curve(x, y, log=True):
+    """
+    StandardCurve of the standards, fitted only the first time these exact
+    standards are seen.
+    """
+    key = standards_hash(x, y, log)
+    if key not in _fits:
+        _fits[key] = StandardCurve(x, y, log)
+    return _fits[key]
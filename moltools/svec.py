@@ -0,0 +1,150 @@
+"""
+SVEC qPCR analysis as a session
+
+The calculations of SVEC_qPCR_analyses_V3.0.py, with the plates of one
+analytical run kept in memory. The plates are read and normalized once and
+the Cq statistics per sample are calculated once. Excluding or including
+powers of the standard curve only refits the curve (a fit that was made
+before is reused, see moltools.stdcurve) and recomputes the copy numbers, so
+you can try exclusions from the console without running the whole script:
+
+    session = QPCRSession(folder_path, 'NIOZ385&NIOZ386', 4.06)
+    session.exclude(0)      # returns the new Final_data table
+    session.curve           # slope, intercept, r2, efficiency, residuals
+    session.include(0)
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from moltools.qpcr import normalize_plates, read_plates, replicate_table
+from moltools.stdcurve import fit_curve, standard_powers
+
+# Plate with the standard dilution series, the other plates are normalized to it
+REFERENCE_PLATE = 'PCR_1'
+
+
+def find_plates(folder_path, analytical_run_code):
+    """Dict plate name (PCR_#) -> path of the .csv exports of a run."""
+    file_names = sorted(glob.glob(
+        os.path.join(folder_path, analytical_run_code + '_*.csv')))
+    return {'PCR_' + os.path.basename(file).split('_')[-1].split('.')[0]: file
+            for file in file_names if 'PCR_' in os.path.basename(file)}
+
+
+class QPCRSession:
+    """
+    One analytical run: the normalized plates, the standard curve and the
+    Cq statistics per sample. power_to_skip are the powers of the standards
+    that are left out of the curve.
+    """
+
+    def __init__(self, folder_path, analytical_run_code, std_curve_copies,
+                 power_to_skip=()):
+        self.folder_path = folder_path
+        self.analytical_run_code = analytical_run_code
+        self.power_to_skip = list(power_to_skip)
+        plates = find_plates(folder_path, analytical_run_code)
+        data = read_plates(list(plates.values()), names=list(plates),
+                           usecols=['Sample', 'Cq'])
+        self.plate_names = list(plates)
+
+        # Normalize all plates on the STD (sample mix) of PCR_1
+        is_std = data['Sample'] == 'STD'
+        data = normalize_plates(data, is_std, REFERENCE_PLATE,
+                                corrected='Corrected_Cq')
+        self.STD_samples = self._std_table(data, is_std)
+
+        # Standard curve samples (10^) of PCR_1
+        is_curve = ((data['plate'] == REFERENCE_PLATE)
+                    & data['Sample'].str.startswith('10^', na=False))
+        stdcurve = data[is_curve].drop(columns='plate')
+        stdcurve['Power'] = standard_powers(stdcurve['Sample'])
+        stdcurve['copies/µL'] = std_curve_copies * 10 ** stdcurve['Power']
+        stdcurve['log_copies'] = np.log10(stdcurve['copies/µL'])
+        self.stdcurve = stdcurve
+        self.data = data[~is_curve]
+
+        # Samples: everything that is not STD, the Cq statistics don't
+        # depend on the standard curve
+        self._samples = self.data[self.data['Sample'] != 'STD']
+        self._cq_table = replicate_table(
+            self._samples, 'Corrected_Cq', prefix='Corrected_Cq_',
+            skipna=False).rename(columns={
+                'mean': 'Mean_Cq', 'stdev': 'Stdev_Cq', 'CV%': 'CV%_Cq'})
+
+        dilution_file = os.path.join(
+            folder_path, analytical_run_code + '_dilution_rates.csv')
+        self.dilutions = None
+        if os.path.exists(dilution_file):
+            self.dilutions = pd.read_csv(dilution_file,
+                                         usecols=['Sample', 'Dilution'])
+
+    def _std_table(self, data, is_std):
+        # Cq of the STD samples per plate (Cq1, Cq2, ...), mean and correction
+        table = replicate_table(data[is_std], 'Cq', by='plate', prefix='Cq')
+        table = table.drop(columns=['stdev', 'CV%']).rename(
+            columns={'mean': 'Mean'}).reindex(self.plate_names)
+        table['Correction'] = table['Mean'] - table.loc[REFERENCE_PLATE, 'Mean']
+        table.index.name = None
+        return table
+
+    def plate(self, name):
+        """Raw data of one plate (Sample, Cq, Corrected_Cq)."""
+        return self.data[self.data['plate'] == name].drop(columns='plate')
+
+    @property
+    def stdcurve_calculations(self):
+        """Standards used for the curve (not skipped, with a Cq)."""
+        return self.stdcurve[
+            ~self.stdcurve['Power'].isin(self.power_to_skip)].dropna()
+
+    @property
+    def skipped_values(self):
+        """Standards of the skipped powers."""
+        return self.stdcurve[self.stdcurve['Power'].isin(self.power_to_skip)]
+
+    @property
+    def curve(self):
+        """StandardCurve of the standards that are not skipped."""
+        standards = self.stdcurve_calculations
+        return fit_curve(standards['log_copies'], standards['Cq'])
+
+    def exclude(self, *powers):
+        """Leaves powers out of the standard curve, returns results()."""
+        self.power_to_skip += [power for power in powers
+                               if power not in self.power_to_skip]
+        return self.results()
+
+    def include(self, *powers):
+        """Uses powers in the standard curve again, returns results()."""
+        self.power_to_skip = [power for power in self.power_to_skip
+                              if power not in powers]
+        return self.results()
+
+    def results(self):
+        """
+        Final_data table: per sample the Corrected_Cq of the replicates, the
+        mean, stdev and CV% of the Cq, the CV% of the copies, the dilution
+        and the copies/µL in the extract (text, 2 decimals).
+        """
+        curve = self.curve
+        table = self._cq_table.copy()
+        # CV% of the copies of the replicates (population stdev)
+        copies = curve.quantity(self._samples['Corrected_Cq']).groupby(
+            self._samples['Sample'])
+        table['CV%_copies'] = (
+            copies.std(ddof=0) / copies.mean() * 100).where(
+                table['Mean_Cq'].notna())
+        table = table.reset_index()
+        if self.dilutions is not None:
+            table = pd.merge(self.dilutions, table, on='Sample', how='left')
+        else:
+            table['Dilution'] = '1'
+        # copies/µL in the extract, times the dilution factor
+        copies = (curve.quantity(table['Mean_Cq'])
+                  * pd.to_numeric(table['Dilution'], errors='coerce'))
+        table['Extract_copies/µL'] = copies.map('{:.2e}'.format)
+        return table
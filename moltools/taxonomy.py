@@ -0,0 +1,140 @@
+"""
+Indexed taxonomy lookup for ASV tables
+
+Reading a complete asvTable_noSingletons.txt with pandas is slow for large
+lanes, while only the '#OTU ID' and 'taxonomy' columns are needed. This module
+reads only those two columns once and saves them in a small SQLite file next
+to the ASV table. Later runs use the SQLite file, unless the ASV table has been
+changed (checked with the modification time and, if that changed, a hash).
+
+    index = TaxonomyIndex("asvTable_noSingletons.txt")
+    index.lookup('asv.1')               # 'Bacteria'
+    index.lookup('asv.1', 'genus')      # genus of asv.1
+    taxonomies = index.as_dict('phylum')
+"""
+import sqlite3
+
+import pandas as pd
+
+from moltools.cache import file_signature, is_unchanged
+
+# The ranks in the taxonomy strings, in order (separated by ';')
+RANKS = ('domain', 'phylum', 'class', 'order', 'family', 'genus', 'species')
+
+# Version of the layout of the index file, a different version is rebuilt
+INDEX_VERSION = '1'
+
+
+def split_taxonomy(taxonomy):
+    """Splits a taxonomy string in a list with one (stripped) name per rank."""
+    if not isinstance(taxonomy, str):
+        return [None] * len(RANKS)
+    names = [name.strip() or None for name in taxonomy.split(';')]
+    names = names[:len(RANKS)]
+    return names + [None] * (len(RANKS) - len(names))
+
+
+def read_taxonomy_columns(asv_table):
+    """Reads only the '#OTU ID' and 'taxonomy' columns from an ASV table."""
+    return pd.read_csv(asv_table, delimiter='\t', header=1,
+                       usecols=['#OTU ID', 'taxonomy'], dtype=str)
+
+
+class TaxonomyIndex:
+    """
+    On-disk index of the taxonomy per ASV. The index is (re)built when it
+    doesn't exist or when the ASV table has changed.
+    """
+
+    def __init__(self, asv_table, index_path=None):
+        self.asv_table = asv_table
+        self.index_path = index_path or asv_table + '.taxonomy.sqlite'
+        self.connection = sqlite3.connect(self.index_path)
+        if not self.is_current():
+            self.build()
+
+    def _meta(self):
+        try:
+            return dict(self.connection.execute('SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError:
+            return {}
+
+    def is_current(self):
+        """True if the index was built from the current ASV table."""
+        meta = self._meta()
+        if meta.get('version') != INDEX_VERSION:
+            return False
+        if not is_unchanged(self.asv_table, meta):
+            return False
+        if meta.get('mtime') != file_signature(self.asv_table, False)['mtime']:
+            # the file was touched or copied, but the contents are the same
+            self._save_meta()
+        return True
+
+    def _save_meta(self):
+        signature = file_signature(self.asv_table)
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                [('version', INDEX_VERSION)] + list(signature.items()))
+
+    def build(self):
+        """(Re)builds the index from the ASV table."""
+        table = read_taxonomy_columns(self.asv_table)
+        rows = ([asv, taxonomy] + split_taxonomy(taxonomy)
+                for asv, taxonomy in zip(table['#OTU ID'], table['taxonomy']))
+        columns = ', '.join(f'"{rank}" TEXT' for rank in RANKS)
+        with self.connection:
+            self.connection.execute('DROP TABLE IF EXISTS taxonomy')
+            self.connection.execute('DROP TABLE IF EXISTS meta')
+            self.connection.execute(
+                'CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.connection.execute(
+                'CREATE TABLE taxonomy (asv TEXT PRIMARY KEY, '
+                f'taxonomy TEXT, {columns}) WITHOUT ROWID')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO taxonomy VALUES '
+                f'(?, ?, {", ".join("?" * len(RANKS))})', rows)
+        self._save_meta()
+
+    @staticmethod
+    def _column(rank):
+        if rank != 'taxonomy' and rank not in RANKS:
+            raise ValueError(
+                f"rank must be 'taxonomy' or one of {RANKS}, not {rank!r}")
+        return f'"{rank}"'
+
+    def lookup(self, asv, rank='domain', default=None):
+        """Name at the given rank (or the full 'taxonomy') of one ASV."""
+        row = self.connection.execute(
+            f'SELECT {self._column(rank)} FROM taxonomy WHERE asv = ?',
+            (asv,)).fetchone()
+        if row is None or row[0] is None:
+            return default
+        return row[0]
+
+    def lineage(self, asv):
+        """Dictionary with the name at every rank of one ASV."""
+        row = self.connection.execute(
+            f'SELECT {", ".join(map(self._column, RANKS))} FROM taxonomy '
+            'WHERE asv = ?', (asv,)).fetchone()
+        return dict(zip(RANKS, row)) if row else None
+
+    def as_dict(self, rank='domain'):
+        """Dictionary ASV -> name at the given rank, for all ASVs."""
+        return dict(self.connection.execute(
+            f'SELECT asv, {self._column(rank)} FROM taxonomy '
+            f'WHERE {self._column(rank)} IS NOT NULL'))
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM taxonomy').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
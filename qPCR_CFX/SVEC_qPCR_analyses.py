@@ -42,14 +42,15 @@ analytical_run_code = 'NIOZ385&NIOZ386' # Analytical run code generated by DAS
 # =============================================================================
 import pandas as pd, numpy as np
 import glob
-import os
+import os, sys
 import statistics
-import math
-from scipy import stats
 from matplotlib import pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.utils import get_column_letter
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.stdcurve import fit_curve, standard_powers
 # =============================================================================
 # =============================================================================
 # Loading in the raw data =====================================================
@@ -101,24 +102,18 @@ PCRs['PCR_1'] = PCR_1
 # Drops all the reactions where the Cq is Nan
 stdcurve = stdcurve.dropna()
 
-stdcurve['power'] = (stdcurve["Sample"].str.split('^', expand=True)[1].astype(float))
+stdcurve['power'] = standard_powers(stdcurve["Sample"])
 
-# For each standard, calculate + add copies/µL and log_copies to the dataframe
-for standard in stdcurve.index:
-    power = stdcurve['power'][standard]
-    copies = std_curve_copies * 10 ** power
-    log_copies = math.log10(copies)
-    stdcurve.loc[standard, 'copies/µL'] = copies
-    stdcurve.loc[standard, 'log_copies'] = log_copies
+# For all standards at once, add copies/µL and log_copies to the dataframe
+stdcurve['copies/µL'] = std_curve_copies * 10 ** stdcurve['power']
+stdcurve['log_copies'] = np.log10(stdcurve['copies/µL'])
 
 # Linear regression + interpolation for standard curve
-slope, yintercept, rv, pv, se = stats.linregress(stdcurve["log_copies"], 
-                                                  stdcurve["Cq"])
-interp = np.linspace(np.min(stdcurve['log_copies']), 
-                            np.max(stdcurve['log_copies']), 
-                            num=500)
-# calculate efficiency
-efficiency = (-1+10**(-1/slope))*100
+curve = fit_curve(stdcurve["log_copies"], stdcurve["Cq"])
+slope, yintercept = curve.slope, curve.intercept
+interp = curve.line(num=500)[0]
+# efficiency
+efficiency = curve.efficiency
 
 # determine highest standard
 max_power = max(stdcurve['power'])
@@ -213,17 +208,12 @@ else:
     print('You did not upload a dilution file. Therefor, all the sample are calculated as undiluted samples! If you did dilute your samples, please upload a dilution file in the folder where your raw data is located.')
     sample_calculations['Dilution'] = '1'
 
-for sample in sample_calculations.index:
-    # Calculate from std curve formula (10** because using log-copies)
-    copies = 10**((sample_calculations["Mean"][sample] - yintercept) / slope)
-    try:
-    # Multiply by dilution factor
-        copies = copies * sample_calculations["Dilution"][sample]
-    except:
-        pass
-    # Add to dataframe, use scientific format, 2 decimal points
-    sample_calculations.loc[sample, "Extract_copies/µL"] = (
-        "{:.2e}".format(copies))
+# Calculate from std curve formula (10** because using log-copies) and multiply
+# by dilution factor, for all samples at once
+copies = (curve.quantity(sample_calculations["Mean"])
+          * pd.to_numeric(sample_calculations["Dilution"], errors='coerce'))
+# Add to dataframe, use scientific format, 2 decimal points
+sample_calculations["Extract_copies/µL"] = copies.map("{:.2e}".format)
 
 # The pathway for the excel file to save. Is used multiple times.
 excel_file = folder_path + "/" + analytical_run_code + "_results.xlsx"
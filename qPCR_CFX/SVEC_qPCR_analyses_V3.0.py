@@ -44,16 +44,15 @@ threshold_copies = 40.0
 # Import statements ===========================================================
 # =============================================================================
 import pandas as pd, numpy as np
-import glob
-import os
-import statistics
-import math
-from scipy import stats
+import os, sys
 from matplotlib import pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill, Font, PatternFill, Alignment, Border, Side
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.svec import QPCRSession
 # =============================================================================
 # Creating output =============================================================
 # =============================================================================    
@@ -63,98 +62,37 @@ newpath = folder_path + r'/results'
 if not os.path.exists(newpath):
     os.makedirs(newpath)
 # =============================================================================
-# Loading in the raw data =====================================================
+# Loading in the raw data and normalizing =====================================
 # =============================================================================
-# List of file names
-# Only keeps the file names if the name contains 'PCR_'
-file_names = glob.glob(os.path.join(folder_path, analytical_run_code + '_*.csv'))
-file_names = [file for file in file_names if 'PCR_' in os.path.basename(file)]
-
-# Empty dictionary for the DataFrames
-PCRs = {}
-
-# Load DataFrames and save them with the name 'PCR' followed by the number from the file name
-for file in file_names:
-    # Extract the number from the file name
-    df_name = os.path.basename(file).split('_')[-1].split('.')[0]
-    # Read the CSV file and select only 'Sample' and 'Cq' columns
-    PCR = pd.read_csv(file, usecols=['Sample', 'Cq'])
-    # Save the DataFrame with the name 'PCR' followed by the number
-    PCRs[f'PCR_{df_name}'] = PCR 
-# =============================================================================
-# Normalize data ==============================================================
-# =============================================================================
-# Creates an empty dataframe 
-STDs_df = pd.DataFrame()
-# Loops through the dataframs in the dict to extract the STD samples and do the
-# correction. For PCR1, the correction is 0. At the end, the STD samples will
-# be added to a new final dataframe which will be put into the final file.
-for PCR_name, PCR_df in PCRs.items():
-    if PCR_name == 'PCR_1':
-        STDs_from_PCR1_df = PCRs['PCR_1'][PCRs['PCR_1']['Sample'] == 'STD']
-        average_STD_PCR1 = statistics.mean(STDs_from_PCR1_df['Cq'])
-        STD_correction_PCR1 = 0
-        PCR_df['Corrected_Cq'] = PCR_df['Cq'] - STD_correction_PCR1
-        STDs = STDs_from_PCR1_df["Cq"].values.tolist()
-        STDs_df[PCR_name] = pd.Series(STDs) # pd.Series is used for different lenghts of lists.
-        
-    elif PCR_name != 'PCR_1':
-        # Filter STD samples from the current DataFrame
-        STDs_from_df = PCR_df[PCR_df['Sample'] == 'STD']
-        # Calculate correction based on the average Cq value of PCR_1
-        STD_correction = statistics.mean(STDs_from_df['Cq']) - average_STD_PCR1
-        # Apply correction to the Cq values of the current DataFrame
-        PCR_df['Corrected_Cq'] = PCR_df['Cq'] - STD_correction
-        STDs = STDs_from_df["Cq"].values.tolist()
-        STDs_df[PCR_name] =  pd.Series(STDs) # pd.Series is used for different lenghts of lists.
-
-# Rename columns to Cq# (e.g., Cq1, Cq2, ...)
-STDs_df.index = [f'Cq{i+1}' for i in range(STDs_df.shape[0])]
-
-# .transpose() flips the columns and rows
-STD_df_final = STDs_df.transpose()
-# Calculates the mean per row and added this in the final column
-STD_df_final["Mean"] = STD_df_final.mean(axis=1)
-# Calculates the differences between the mean.
-STD_df_final["Correction"] = STD_df_final["Mean"] - average_STD_PCR1
+# Reads all .csv files of the run (only the file names that contain 'PCR_'),
+# normalizes the Cq values of every PCR on the STD samples (for PCR_1 the
+# correction is 0) and calculates the Cq statistics per sample. All of this is
+# kept in the session. To try other power_to_skip values without running this
+# whole script, use the session from the console: session.exclude(1) or
+# session.include(0) only refits the curve and returns the new Final_data
+session = QPCRSession(folder_path, analytical_run_code, std_curve_copies,
+                      power_to_skip)
+# The raw data per PCR, without the standard curve samples of PCR_1
+PCRs = {PCR_name: session.plate(PCR_name) for PCR_name in session.plate_names}
+# The STD samples per PCR (Cq1, Cq2, ...), their mean and the correction
+STD_df_final = session.STD_samples
 # =============================================================================
 # Making a standard curve =====================================================
 # =============================================================================
-# Select the DataFrame 'stdcurve' by filtering on 'Sample' starting with "10^"
-stdcurve = PCRs['PCR_1'][PCRs['PCR_1']['Sample'].str.startswith("10^")]
-# Remove the rows from 'PCR_1' that are already used in 'stdcurve'
-PCR_1 = PCRs['PCR_1'].drop(stdcurve.index)
-# Update the 'PCR_1' DataFrame in the PCRs dictionary
-PCRs['PCR_1'] = PCR_1
-
-stdcurve['Power'] = (stdcurve["Sample"].str.split('^', expand=True)[1].astype(float))
-
-# For each standard, calculate + add copies/µL and log_copies to the dataframe
-for standard in stdcurve.index:
-    power = stdcurve['Power'][standard]
-    copies = std_curve_copies * 10 ** power
-    log_copies = math.log10(copies)
-    stdcurve.loc[standard, 'copies/µL'] = copies
-    stdcurve.loc[standard, 'log_copies'] = log_copies
-    
-skipped_values = pd.DataFrame()
-stdcurve_calculations = stdcurve
-for power in power_to_skip:
-    stdcurve_calculations = stdcurve_calculations.drop(stdcurve_calculations[stdcurve_calculations['Power'] == power].index)
-    new_row = stdcurve.loc[stdcurve['Power'] == power]
-    skipped_values = pd.concat([skipped_values, new_row])
-
-# Drops all the reactions where the Cq is Nan
-stdcurve_calculations = stdcurve_calculations.dropna()
-
-# Linear regression + interpolation for standard curve
-slope, yintercept, r2, pv, se = stats.linregress(stdcurve_calculations["log_copies"], 
-                                                  stdcurve_calculations["Cq"])
-interp = np.linspace(np.min(stdcurve_calculations['log_copies']), 
-                            np.max(stdcurve_calculations['log_copies']), 
-                            num=500)
-# calculate efficiency
-efficiency = (-1+10**(-1/slope))*100
+# The standard curve samples (10^) of PCR_1, with Power, copies/µL and
+# log_copies, and the ones that are used and skipped for the curve (the ones
+# without Cq are not used either)
+stdcurve = session.stdcurve
+stdcurve_calculations = session.stdcurve_calculations
+skipped_values = session.skipped_values
+
+# Linear regression + interpolation for standard curve, the fit is reused if
+# the same standards were fitted before
+curve = session.curve
+slope, yintercept, r2 = curve.slope, curve.intercept, curve.r2
+interp = curve.line(num=500)[0]
+# efficiency
+efficiency = curve.efficiency
 
 # determine highest standard
 max_power = max(stdcurve_calculations['Power'])
@@ -216,85 +154,15 @@ plt.savefig(newpath +"/" + analytical_run_code + "_standard_curve.png")
 # =============================================================================
 # Sample calculations =========================================================
 # =============================================================================
-# Creates an empty Dataframe with the columns Sample and Corrected_Cq
-combined_data = pd.DataFrame(columns=['Sample', 'Corrected_Cq'])
-
-# Iterates over each DataFrame in PCRs and adds every line that is not STD or
-# starts with 10^ and adds them to the empty DataFrame above
-for PCR_name, PCR_df in PCRs.items():
-    for index, row in PCR_df.iterrows():
-        if row['Sample'] != 'STD' or row['Sample'].startswith('10^'):
-            combined_data.loc[len(combined_data)] = row[['Sample', 'Corrected_Cq']]
-
-# Combine duplicate measurements
-sample_calculations = combined_data.groupby('Sample')['Corrected_Cq'].apply(list).reset_index()
-
-test = sample_calculations
-for index, row in sample_calculations.iterrows():
-    # Iterate over each element in the list
-    Cqs = []
-    for i, value in enumerate(row['Corrected_Cq']):
-        # Create a new column if it doesn't exist
-        col_name_cq = f'Corrected_Cq_{i + 1}'
-        if col_name_cq not in sample_calculations.columns:
-            sample_calculations[col_name_cq] = None  # or np.nan
-        # Assign the value to the new column
-        sample_calculations.at[index, col_name_cq] = value
-        Cqs.append(value)
-    sample_calculations.at[index, 'Mean_Cq'] = mean_cq = statistics.mean(Cqs)
-    sample_calculations.at[index, 'Stdev_Cq'] = std_cq = np.std(Cqs, ddof=1)
-    sample_calculations.at[index, "CV%_Cq"] = (std_cq/mean_cq)*100
-    
-    copies = []
-    for cq in Cqs: 
-        copie = 10**((cq - yintercept) / slope)
-        copies.append(copie)
-    
-    std_copies =  np.std(copies)
-    mean_copies = statistics.mean(copies)
-    sample_calculations.at[index, 'CV%_copies'] = (std_copies/mean_copies)*100
-
-# Drop the original 'Corrected_Cq' column.
-sample_calculations.drop(columns=['Corrected_Cq'], inplace=True)
-
-# Changes the order of the dataframe
-all_headers = sample_calculations.columns
-corrected_Cq_headers = []
-other_headers = []
-for header in all_headers:
-    if header.startswith('Corrected_Cq'):
-        corrected_Cq_headers.append(header)
-    else:
-        other_headers.append(header)
-sample_calculations = sample_calculations[corrected_Cq_headers + other_headers]
-
-# Creates the pathway to the dilution file
-dilution_file = folder_path +'/'+ analytical_run_code +'_dilution_rates.csv'
-
-dilution_file_check = os.path.exists(dilution_file)
-
-if dilution_file_check:
-    # Reads the dilution rates file and uses the columns named 'Sample' and 'Dilution'
-    dilutions = pd.read_csv((dilution_file), usecols=['Sample', 'Dilution'])
-   
-    # Merges the 2 dataframes and overwrites the sample_calculations column
-    sample_calculations = pd.merge(dilutions, sample_calculations, on = 'Sample', how='left')
-    
-else:    
+# Final_data: one row per sample with the Corrected_Cq of every replicate in
+# the columns Corrected_Cq_1, Corrected_Cq_2, ..., the mean, stdev and CV% of
+# these Cqs, the CV% of the copies, the dilution and the copies/µL in the
+# extract (from the std curve formula, multiplied by the dilution factor)
+sample_calculations = session.results()
+
+# The dilution rates are read from 'analytical_run_code'_dilution_rates.csv
+if session.dilutions is None:
     print('You did not upload a dilution file. Therefor, all the sample are calculated as undiluted samples! If you did dilute your samples, please upload a dilution file in the folder where your raw data is located.')
-    sample_calculations['Dilution'] = '1'
-
-for sample in sample_calculations.index:
-    # Calculate from std curve formula (10** because using log-copies)
-    copies = 10**((sample_calculations["Mean_Cq"][sample] - yintercept) / slope)
-    try:
-    # Multiply by dilution factor
-        copies = copies * sample_calculations["Dilution"][sample]
-    except:
-        pass
-    # Add to dataframe, use scientific format, 2 decimal points
-    sample_calculations.loc[sample, "Extract_copies/µL"] = (
-        "{:.2e}".format(copies))
 # =============================================================================
 # Creating CV% plots ==========================================================
 # =============================================================================
@@ -335,7 +203,8 @@ plt.show()
 # Preparing the dataframes as prefered
 sample_calculations.set_index("Sample", inplace = True)
 
-stdcurve.set_index("Sample", inplace = True)
+# a new frame, session.stdcurve stays as it is for use from the console
+stdcurve = session.stdcurve.set_index("Sample")
 for PCR_name, PCR_df in PCRs.items():
     PCR_df.set_index("Sample", inplace = True)
 
@@ -29,12 +29,15 @@
 # Save as .csv otherwise, Cq values are not correct
 
 # Import needed packages=======================================================
+import os, sys
 import pandas as pd, numpy as np
-from scipy import stats
 from matplotlib import pyplot as plt
-import math
 from natsort import index_natsorted 
  ## to be able to sort naturally, so 1,2,14,21 instead of 1,14,2,21
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.qpcr import read_plates, normalize_plates, replicate_table
+from moltools.stdcurve import fit_curve, standard_powers
 # =============================================================================
 
 # !!!Variables to set==========================================================
@@ -61,49 +64,33 @@ save_location = '//zeus/mmb/molecular_ecology/mollab_team/Projects/2022/Helge/Ti
 
 # Import file==================================================================
 # =============================================================================
-PCR1 = pd.read_csv(PCR1, delimiter=';', decimal=decimal_sign)
-PCRs = [PCR1]
-if PCR2:
-    PCR2 = pd.read_csv(PCR2, delimiter=';', decimal=decimal_sign)
-    PCRs = PCRs.append(PCR2)
-    if PCR3:
-        PCR3 = pd.read_csv(PCR3, delimiter=';', decimal=decimal_sign)
-        PCRs = PCRs.append(PCR3)
-        if PCR4:
-            PCR4 = pd.read_csv(PCR4, delimiter=';', decimal=decimal_sign)
-            PCRs = PCRs.append(PCR4)
-if PCRredo:
-    PCRredo = pd.read_csv(PCRredo, delimiter=';', decimal=decimal_sign)
-    PCRs = PCRs.append(PCRredo)
+# All PCRs are read in one table, the number of the PCR (1, 2, ...) is in the
+# column 'plate'. PCR1 (with the standard dilution series) is plate 1
+PCRs = [PCR for PCR in (PCR1, PCR2, PCR3, PCR4, PCRredo) if PCR]
+data = read_plates(PCRs, delimiter=';', decimal=decimal_sign)
 # =============================================================================
 
 
 # Making a standard curve======================================================
 # =============================================================================
 # Extract standard curve data
-stdcurve = PCR1[(PCR1["Content"].str.startswith("Std"))]
+stdcurve = data[(data['plate'] == 1) & 
+                (data["Content"].str.startswith("Std", na=False))]
 # Remove NaN values
 stdcurve = stdcurve[stdcurve['Cq'].notna()]
 # From the Sample column, extract the power (copies) of the standards
-stdcurve['power'] = (
-    stdcurve["Sample"].str.split('^', expand=True)[1].astype(float))
+stdcurve['power'] = standard_powers(stdcurve["Sample"])
 
-# For each standard, calculate + add copies/µL and log_copies to the dataframe
-for standard in stdcurve.index:
-    power = stdcurve['power'][standard]
-    copies = std_copies * 10 ** power
-    log_copies = math.log10(copies)
-    stdcurve.loc[standard, 'copies/µL'] = copies
-    stdcurve.loc[standard, 'log_copies'] = log_copies
+# For all standards at once, add copies/µL and log_copies to the dataframe
+stdcurve['copies/µL'] = std_copies * 10 ** stdcurve['power']
+stdcurve['log_copies'] = np.log10(stdcurve['copies/µL'])
 
 # Linear regression + interpolation for standard curve
-slope, yintercept, rv, pv, se = stats.linregress(stdcurve["log_copies"], 
-                                                  stdcurve["Cq"])
-interp = np.linspace(np.min(stdcurve['log_copies']), 
-                            np.max(stdcurve['log_copies']), 
-                            num=500)
-# calculate efficiency
-efficiency = (-1+10**(-1/slope))*100
+curve = fit_curve(stdcurve["log_copies"], stdcurve["Cq"])
+slope, yintercept = curve.slope, curve.intercept
+interp = curve.line(num=500)[0]
+# efficiency
+efficiency = curve.efficiency
 
 # determine highest standard
 max_power = max(stdcurve['power'])
@@ -148,68 +135,21 @@ plt.tight_layout()
 # =============================================================================
 
 ##### Normalize data from subsequent PCRs to PCR with standard dilution series
-data = pd.DataFrame()
-
-for PCR in PCRs:
-    sample_mix = PCR[(PCR['Content'].str.startswith('Pos Ctrl'))]
-      ## Extract sample_mix data
-    mean_sample_mix = float(sample_mix['Cq'].mean())
-      ## calculate mean Cq of sample_mix 
-    if 'Std' in PCR.values:
-            normalization = mean_sample_mix
-      ## If the specified PCR contains the std dilution series, 
-      ## use that sample_mix to normalize
-    
-    normalization_factor = mean_sample_mix - normalization
-    if math.isnan(normalization_factor):
-        normalization_factor = 0
-      ## Calculate normalization_factor for specified PCR
-      
-    for sample in PCR.index:
-        Cq = PCR['Cq'][sample] + normalization_factor
-        PCR.loc[sample, 'corrected Cq'] = Cq
-          ## Normalize Cq values based on normalization_factor
-    
-    data = data.append(PCR)
+# Per plate the mean Cq of the sample_mix minus the mean Cq of the sample_mix
+# of PCR1 is the normalization_factor (0 if a plate has no sample_mix)
+sample_mix = data['Content'].str.startswith('Pos Ctrl', na=False)
+  ## corrected Cq = Cq - normalization_factor of the plate, for all PCRs at once
+data = normalize_plates(data, sample_mix, reference_plate=1)
 
 # Sample calculations==========================================================
 # =============================================================================    
 
 ##### Extract sample data
-samples_raw = data[(data["Content"].str.startswith("Unkn"))]
-# make str from float Cq values (for next step)
-samples_raw["corrected Cq"] = samples_raw["corrected Cq"].astype(str)
-# combine duplicate measurements
+samples_raw = data[(data["Content"].str.startswith("Unkn", na=False))]
+# One row per sample with the corrected Cq values of all replicates (corrected
+# Cq1, corrected Cq2, ..., any number of replicates), their mean, stdev and CV%
 sample_calculations = (
-    samples_raw.groupby("Sample")["corrected Cq"].apply('-'.join))
-# Convert series to dataframe
-sample_calculations = sample_calculations.to_frame()
-
-# Check how many reps each sample has (count the join marks '-' +1)
-for sample in sample_calculations.index:
-    reps = sample_calculations["corrected Cq"][sample].count('-') + 1
-    sample_calculations.loc[sample, "reps"] = reps
-# What is the highest amount of reps
-rep_max = int(sample_calculations["reps"].max())
-# a list for possible seperate Cq values, max 5 repetitions
-Cqs = (["corrected Cq1",
-        "corrected Cq2",
-        "corrected Cq3",
-        "corrected Cq4",
-        "corrected Cq5"])
-# Get seperate CQ values, amount depending on number of replicates
-sample_calculations[Cqs[:rep_max]]  = (
-        sample_calculations["corrected Cq"].
-        str.split('-', expand=True).astype(float))
-
-# remove joined Cq and reps column
-sample_calculations = sample_calculations.drop(['corrected Cq', 'reps'],axis=1)
-
-# Calculate mean Cq values and stdev
-sample_calculations['mean']= sample_calculations.mean(axis=1)
-sample_calculations['stdev']= (
-    sample_calculations.iloc[:, sample_calculations.columns!="mean"].
-    std(axis=1))
+    replicate_table(samples_raw, 'corrected Cq').reset_index())
 
 # Add dilution factor to the dataframe
 sample_calculations = pd.merge(
@@ -218,14 +158,12 @@ sample_calculations = sample_calculations.drop_duplicates()
 
 
 # calculate copies/µL in the DNA extract
-for sample in sample_calculations.index:
-    # calculate from std curve formula (10** because using log-copies)
-    copies = 10**((sample_calculations["mean"][sample] - yintercept) / slope)
-    # multiply by dilution factor
-    # copies = copies * sample_calculations["dilution"][sample]
-    # add to dataframe, use scientific format, 2 decimal points
-    sample_calculations.loc[sample, "extract copies/µL"] = (
-        "{:.2e}".format(copies))
+# calculate from std curve formula (10** because using log-copies), all at once
+copies = curve.quantity(sample_calculations["mean"])
+# multiply by dilution factor
+# copies = copies * sample_calculations["dilution"]
+# add to dataframe, use scientific format, 2 decimal points
+sample_calculations["extract copies/µL"] = copies.map("{:.2e}".format)
     
 # Sort samples, naturally (so 1,2,14,21 instead of 1,14,2,21)
 sample_calculations.sort_values(
@@ -0,0 +1,55 @@
+# =============================================================================
+# Title:    Barcode distance check
+# Version:  1.0
+# Goal:     Minimum distances within a barcode library (incl. rev. compl.)
+# Date:     261018
+# =============================================================================
+# Make sure your file is an .xlsx file
+# Make sure the column with barcodes is named 'barcode' and the column with
+# the names is named 'Name'
+# metric 'hamming': number of different bases (barcodes of the same length)
+# metric 'edit': also counts insertions and deletions
+# All pairs of barcodes (and barcode + reverse complement of a barcode) with a
+# distance smaller than min_distance are saved in the 'pairs' sheet.
+# =============================================================================
+
+# IMPORT STATEMENTS============================================================
+# =============================================================================
+import pandas as pd       # to be able to work with tables
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.distances import barcode_distances
+# =============================================================================
+
+# VARIABLES TO SET#!!!=========================================================
+# =============================================================================
+file_path = 'molecular_tools/reverse_complement/'
+sample_file = file_path + '12S_barcodes_minDistances1_20210916.xlsx'
+metric = 'hamming'  # 'hamming' or 'edit'
+min_distance = 3    # pairs closer than this are reported
+workers = 4         # number of processes used for the calculation
+# =============================================================================
+
+# the if statement is needed to use more than 1 worker on Windows
+if __name__ == '__main__':
+    # IMPORTING DATA===========================================================
+    # =========================================================================
+    file = pd.read_excel(sample_file)
+    # =========================================================================
+
+    # CALCULATE DISTANCES======================================================
+    # =========================================================================
+    summary, pairs = barcode_distances(file['Name'], file['barcode'],
+                                       metric=metric,
+                                       min_distance=min_distance,
+                                       workers=workers)
+    print(f'{len(pairs)} pairs with a distance smaller than {min_distance}')
+    # =========================================================================
+
+    # SAVE RESULTS=============================================================
+    # =========================================================================
+    with pd.ExcelWriter(file_path + '12S_barcode_distances.xlsx') as writer:
+        summary.to_excel(writer, sheet_name='distances', index=False)
+        pairs.to_excel(writer, sheet_name='pairs', index=False)
+    # =========================================================================
@@ -12,7 +12,11 @@
 # IMPORT STATEMENTS============================================================
 # =============================================================================
 import pandas as pd       # to be able to work with tables
-from Bio.Seq import Seq   # to be able to do compl_rev
+import os, sys
+# makes the shared moltools package in the root of the repository importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.revcomp import (reverse_complement_column,  # to be able to do compl_rev
+                             find_revcomp_matches)
 # =============================================================================
 
 # VARIABLES TO SET#!!!=========================================================
@@ -28,25 +32,19 @@ file = pd.read_excel(sample_file)
 
 # ADD COMPLEMENT REVERSE BARCODES AND CHECK FOR MATCHES========================
 # =============================================================================
-### New column with reverse complement barcode
-file['reverse_complement']=''
-file['match_name']=''
-for primer in file.index:
-    barcode = Seq(file['barcode'][primer])
-    reverse_complement = barcode.reverse_complement()
-    file.at[primer,'reverse_complement'] = str(reverse_complement)
-
-
-    ###Check if barcode matches any RC barcode
-    match = file.index[file['reverse_complement'] == barcode].tolist()
-    if len(match) > 0:
-        file.loc[primer, 'match_name'] = file['Name'][match[0]]
-
-  
-    ###Check if RC barcode matches any barcode
-    match = file.index[file['barcode'] == reverse_complement].tolist()
-    if len(match) > 0:
-        file.loc[primer, 'match_name'] = file['Name'][match[0]]
+### New column with reverse complement barcode (all barcodes at once)
+file['reverse_complement'] = reverse_complement_column(file['barcode'])
+
+###Check which barcodes match the RC of any other barcode
+###all matches are listed, separated by ', '
+###degenerate bases (N, R, Y, ...) are taken into account
+matches = find_revcomp_matches(file['barcode'], iupac=True)
+names = file['Name'].astype(str).tolist()
+file['match_name'] = [', '.join(names[match] for match in row_matches)
+                      for row_matches in matches]
+###Barcodes that are their own reverse complement
+file['palindrome'] = file['barcode'].str.upper() == (
+    file['reverse_complement'].str.upper())
 # =============================================================================
 
 # SAVE NEW DATAFRAME===========================================================
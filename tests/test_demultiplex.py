@@ -0,0 +1,111 @@
+"""
+Checks of the barcode index with one mismatch and of demultiplexing a small
+set of reads. Run from the root of the repository with:  python -m pytest tests
+"""
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools import demultiplex as demultiplex_module
+from moltools.demultiplex import (UNASSIGNED, barcode_index, demultiplex,
+                                  hamming_neighbours)
+
+BARCODES = {'AAAAAA': 'S1', 'CCCCCC': 'S2',
+            # 2 mismatches apart: their common neighbours are ambiguous
+            'GGGGTT': 'S3', 'GGGGAA': 'S4'}
+
+
+def test_exact_barcodes():
+    index = barcode_index(BARCODES)
+    for barcode, sample in BARCODES.items():
+        assert index[barcode] == sample
+
+
+def test_one_mismatch():
+    index = barcode_index(BARCODES)
+    assert index['AAGAAA'] == 'S1'
+    assert index['CCCCCN'] == 'S2'
+    assert index['GGGGTC'] == 'S3'
+    # two mismatches are not in the index
+    assert 'AAGGAA' not in index
+
+
+def test_ambiguous_neighbours_are_left_out():
+    index = barcode_index(BARCODES)
+    # GGGGTA and GGGGAT are one mismatch from both S3 and S4
+    assert 'GGGGTA' not in index
+    assert 'GGGGAT' not in index
+    ambiguous = set(hamming_neighbours('GGGGTT')) & set(
+        hamming_neighbours('GGGGAA'))
+    assert ambiguous == {'GGGGTA', 'GGGGAT'}
+
+
+def test_exact_barcode_wins_over_a_neighbour():
+    # ACAAAA is an exact barcode and one mismatch from AAAAAA
+    index = barcode_index({'AAAAAA': 'S1', 'ACAAAA': 'S2'})
+    assert index['ACAAAA'] == 'S2'
+    assert index['AAAAAA'] == 'S1'
+
+
+def test_no_mismatches():
+    assert barcode_index(BARCODES, mismatches=0) == BARCODES
+
+
+def test_unassigned_is_reserved():
+    with pytest.raises(ValueError):
+        barcode_index({'AAAAAA': 'Unassigned'})
+
+
+def write_reads(path, barcodes):
+    with open(path, 'w') as handle:
+        for i, barcode in enumerate(barcodes):
+            handle.write(f'@M0:1:{i}:{barcode} 1:N:0\nACGT\n+\nIIII\n')
+
+
+def read_names(path):
+    with open(path) as handle:
+        return [line.split(':')[2] for line in handle.read().splitlines()[::4]]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_demultiplex_reads(tmp_path, compress):
+    mapping_file = tmp_path / 'mapping_file.txt'
+    mapping_file.write_text('#SampleID\tBarcodeSequence\n' + ''.join(
+        f'{sample}\t{barcode}\n' for barcode, sample in BARCODES.items()))
+    reads = tmp_path / 'reads.fastq'
+    # exact, one mismatch, lower case, ambiguous and unknown barcodes
+    write_reads(reads, ['AAAAAA', 'AAATAA', 'cccccc', 'GGGGTA', 'TTTTTT',
+                        'GGGGAA'])
+    out = tmp_path / 'out'
+    counts = demultiplex(str(mapping_file), str(reads), str(out),
+                         compress=compress)
+    assert counts == {'S1': 2, 'S2': 1, 'S3': 0, 'S4': 1, UNASSIGNED: 2}
+    if compress:
+        with gzip.open(out / 'S1.fastq.gz', 'rt') as handle:
+            assert handle.read().count('\n') == 8
+    else:
+        assert read_names(out / 'S1.fastq') == ['0', '1']
+        assert read_names(out / (UNASSIGNED + '.fastq')) == ['3', '4']
+        assert not (out / 'S3.fastq').exists()
+
+
+def test_files_closed_to_make_room_are_appended(tmp_path, monkeypatch):
+    # with one open file every sample switch closes a file, and the gzip
+    # output gets more than one member
+    monkeypatch.setattr(demultiplex_module, 'MAX_OPEN_FILES', 1)
+    monkeypatch.setattr(demultiplex_module, 'SAMPLE_BUFFER', 1)
+    mapping_file = tmp_path / 'mapping_file.txt'
+    mapping_file.write_text('#SampleID\tBarcodeSequence\nS1\tAAAAAA\n'
+                            'S2\tCCCCCC\n')
+    reads = tmp_path / 'reads.fastq'
+    write_reads(reads, ['AAAAAA', 'CCCCCC'] * 5)
+    out = tmp_path / 'out'
+    demultiplex(str(mapping_file), str(reads), str(out), compress=True)
+    for sample, first in (('S1', 0), ('S2', 1)):
+        with gzip.open(out / f'{sample}.fastq.gz', 'rt') as handle:
+            names = [line.split(':')[2]
+                     for line in handle.read().splitlines()[::4]]
+        assert names == [str(i) for i in range(first, 10, 2)]
@@ -0,0 +1,112 @@
+"""
+Checks of the barcode library distances against a simple pairwise loop.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.designer import hamming, levenshtein
+from moltools.distances import barcode_distances, edit_block, encode_barcodes
+from moltools.revcomp import reverse_complement
+
+
+def random_barcodes(number, lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    return [''.join(rng.choice(list('ACGT'), rng.integers(*lengths)))
+            for _ in range(number)]
+
+
+def brute_force(barcodes, distance, min_distance, cap=None):
+    # per barcode the minimum distance to the others and to all reverse
+    # complements, and all pairs closer than min_distance
+    rcs = [reverse_complement(barcode) for barcode in barcodes]
+    minima, rc_minima, pairs = [], [], set()
+    for i, a in enumerate(barcodes):
+        others = [distance(a, b) for b in barcodes]
+        to_rcs = [distance(a, rc) for rc in rcs]
+        if cap is not None:
+            others = [min(d, cap) for d in others]
+            to_rcs = [min(d, cap) for d in to_rcs]
+        minima.append(min(d for j, d in enumerate(others) if j != i))
+        rc_minima.append(min(to_rcs))
+        pairs.update((i, j, d, 'barcode') for j, d in enumerate(others)
+                     if j > i and d < min_distance)
+        pairs.update((i, j, d, 'reverse complement')
+                     for j, d in enumerate(to_rcs)
+                     if j >= i and d < min_distance)
+    return minima, rc_minima, pairs
+
+
+def found_pairs(pairs, names):
+    position = {name: i for i, name in enumerate(names)}
+    return {(position[row.name_1], position[row.name_2], row.distance,
+             row.type) for row in pairs.itertuples()}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_hamming_matches_brute_force(workers):
+    barcodes = random_barcodes(150, (8, 9))
+    # a duplicate and a barcode with its reverse complement in the library
+    barcodes += [barcodes[0], reverse_complement(barcodes[1])]
+    names = [f'bc{i}' for i in range(len(barcodes))]
+    summary, pairs = barcode_distances(names, barcodes, metric='hamming',
+                                       min_distance=4, workers=workers,
+                                       block_size=40)
+    minima, rc_minima, expected = brute_force(barcodes, hamming, 4)
+    assert summary['min_distance'].tolist() == minima
+    assert summary['min_distance_revcomp'].tolist() == rc_minima
+    assert found_pairs(pairs, names) == expected
+
+
+def test_hamming_over_more_than_one_word():
+    # 40 bases don't fit in one 64 bit word
+    barcodes = random_barcodes(30, (40, 41), seed=1)
+    barcodes.append(barcodes[0][:-1] + ('A' if barcodes[0][-1] != 'A' else 'C'))
+    names = [f'bc{i}' for i in range(len(barcodes))]
+    summary, pairs = barcode_distances(names, barcodes, min_distance=3)
+    minima, rc_minima, expected = brute_force(barcodes, hamming, 3)
+    assert summary['min_distance'].tolist() == minima
+    assert found_pairs(pairs, names) == expected
+
+
+def test_edit_matches_brute_force():
+    band = 3
+    barcodes = random_barcodes(80, (6, 11), seed=2)
+    names = [f'bc{i}' for i in range(len(barcodes))]
+    summary, pairs = barcode_distances(names, barcodes, metric='edit',
+                                       min_distance=3, band=band,
+                                       block_size=30)
+    minima, rc_minima, expected = brute_force(barcodes, levenshtein, 3,
+                                              cap=band + 1)
+    assert summary['min_distance'].tolist() == minima
+    assert summary['min_distance_revcomp'].tolist() == rc_minima
+    assert found_pairs(pairs, names) == expected
+
+
+@pytest.mark.parametrize('band', [254, 300])
+def test_edit_block_with_a_wide_band(band):
+    # long queries that share no base with the targets fill the band with
+    # distances at the cap, cap 255 used to wrap around to 0 in the uint8 DP
+    queries = ['A' * 260, 'A' * 300, 'ACGT' * 65]
+    targets = ['C' * 10, 'C' * 40, 'ACGT' * 10]
+    query = encode_barcodes(queries)
+    target = encode_barcodes(targets)
+    result = edit_block(query.code_matrix(), query.lengths,
+                        target.code_matrix(), target.lengths, band)
+    expected = [[min(levenshtein(a, b), band + 1) for b in targets]
+                for a in queries]
+    assert result.tolist() == expected
+
+
+def test_hamming_needs_barcodes_of_the_same_length():
+    with pytest.raises(ValueError):
+        barcode_distances(['a', 'b'], ['ACGT', 'ACGTA'])
+
+
+def test_degenerate_barcodes_are_refused():
+    with pytest.raises(ValueError):
+        barcode_distances(['a', 'b'], ['ACGN', 'ACGT'])
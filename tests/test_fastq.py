@@ -0,0 +1,53 @@
+"""
+Checks of the vectorized quality trimming against the per read algorithm.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.fastq import (FastqBatch, FastqRecord, quality_trim_index,
+                            quality_trim_lengths)
+
+
+def random_reads(number, seed=0):
+    rng = np.random.default_rng(seed)
+    reads = []
+    for i in range(number):
+        length = rng.integers(0, 80)
+        quality = ''.join(chr(33 + q) for q in rng.integers(2, 41, length))
+        reads.append(FastqRecord(f'read{i}', 'A' * length, quality))
+    return reads
+
+
+def test_quality_trim_lengths_matches_scalar():
+    reads = random_reads(2000)
+    batch = FastqBatch.from_records(reads)
+    for threshold in (10, 20, 30):
+        expected = [quality_trim_index(read.quality, threshold)
+                    for read in reads]
+        assert quality_trim_lengths(batch, threshold).tolist() == expected
+
+
+def test_good_3_end_stops_the_scan():
+    # low quality at the start, but the read ends in Q30: nothing is trimmed
+    read = FastqRecord('read', 'A' * 25, '##########' + '?' * 15)
+    batch = FastqBatch.from_records([read])
+    assert quality_trim_lengths(batch, 20).tolist() == [25]
+    assert quality_trim_index(read.quality, 20) == 25
+
+
+def test_low_quality_3_end_is_trimmed():
+    read = FastqRecord('read', 'A' * 20, '?' * 15 + '#####')
+    batch = FastqBatch.from_records([read])
+    assert quality_trim_lengths(batch, 20).tolist() == [15]
+
+
+def test_empty_reads_are_not_trimmed():
+    # e.g. reads that were only the primer, empty after primer removal
+    batch = FastqBatch.from_records([FastqRecord('read1', '', ''),
+                                     FastqRecord('read2', '', '')])
+    assert quality_trim_lengths(batch, 20).tolist() == [0, 0]
+    assert len(quality_trim_lengths(FastqBatch.from_records([]), 20)) == 0
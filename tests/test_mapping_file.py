@@ -0,0 +1,58 @@
+"""
+Checks of the problems that check_mapping_file reports.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.mapping_file import check_mapping_file
+
+
+def mapping_file(**columns):
+    data = {'#SampleID': ['S1', 'S2', 'S3'],
+            'BarcodeSequence': ['AACCGGTT', 'ACGTACGT', 'TTGGCCAA'],
+            'ForwardPrimerName': ['515F_1', '515F_2', '515F_3'],
+            'ReversePrimerName': ['926R_1', '926R_1', '926R_1']}
+    data.update(columns)
+    return pd.DataFrame(data)
+
+
+def test_a_good_mapping_file_passes():
+    check_mapping_file(mapping_file())
+
+
+def test_missing_barcodes_are_listed():
+    mf = mapping_file(BarcodeSequence=['AACCGGTT', np.nan, np.nan],
+                      ForwardPrimerName=['515F_1', '515F_2', np.nan])
+    with pytest.raises(ValueError) as error:
+        check_mapping_file(mf)
+    # an empty primer name is shown as ?
+    assert str(error.value) == ('No barcode found in the primer lists for: '
+                                '515F_2/926R_1, ?/926R_1')
+
+
+def test_duplicated_sample_ids():
+    mf = mapping_file(**{'#SampleID': ['S1', 'S2', 'S1']})
+    with pytest.raises(ValueError, match=r'#SampleID used for more than one '
+                                         r'sample: S1 \(S1, S1\)'):
+        check_mapping_file(mf)
+
+
+def test_duplicated_barcodes_ignore_case():
+    mf = mapping_file(BarcodeSequence=['AACCGGTT', 'aaccggtt', 'TTGGCCAA'])
+    with pytest.raises(ValueError, match=r'BarcodeSequence used for more than '
+                                         r'one sample: AACCGGTT \(S1, S2\)'):
+        check_mapping_file(mf)
+
+
+def test_all_problems_at_once():
+    mf = mapping_file(**{'#SampleID': ['S1', 'S1', 'S3'],
+                         'BarcodeSequence': ['AACCGGTT', 'AACCGGTT', np.nan]})
+    with pytest.raises(ValueError) as error:
+        check_mapping_file(mf)
+    assert len(str(error.value).splitlines()) == 3
@@ -0,0 +1,50 @@
+"""
+Checks of the compiled primer catalog and its cache file.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import pickle
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.primer_catalog import PrimerCatalog
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / 'primer_lists.xlsx')
+    pd.DataFrame({'Barcode_Forward_Primer': ['AACC'],
+                  'Barcode_Reverse_Primer': ['GGGT']}).to_excel(
+        path, sheet_name='both', index=False)
+    return path
+
+
+def test_every_barcode_column_gets_its_reverse_complement(workbook):
+    sheet = PrimerCatalog(workbook).sheet('both')
+    assert sheet['RevComplBarcode_Forward_Primer'].tolist() == ['GGTT']
+    assert sheet['RevComplBarcode_Reverse_Primer'].tolist() == ['ACCC']
+
+
+@pytest.mark.parametrize('content', [b'', b'not a pickle',
+                                     # a class that no longer exists
+                                     b'\x80\x04cgone_module\nGone\n.'])
+def test_unreadable_cache_is_rebuilt(workbook, content):
+    PrimerCatalog(workbook)
+    with open(workbook + '.catalog.pkl', 'wb') as f:
+        f.write(content)
+    assert 'both' in PrimerCatalog(workbook)
+    with open(workbook + '.catalog.pkl', 'rb') as f:
+        assert 'both' in pickle.load(f)['sheets']
+
+
+def test_touched_workbook_saves_the_new_signature(workbook):
+    PrimerCatalog(workbook)
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    PrimerCatalog(workbook)
+    with open(workbook + '.catalog.pkl', 'rb') as f:
+        signature = pickle.load(f)['signature']
+    assert signature['mtime'] == str(os.stat(workbook).st_mtime_ns)
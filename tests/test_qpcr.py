@@ -0,0 +1,46 @@
+"""
+Checks of the per plate normalization and the replicate table of qPCR data.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.qpcr import normalize_plates, replicate_table
+
+
+def test_replicate_table():
+    data = pd.DataFrame({'Sample': ['A', 'B', 'A', 'A'],
+                         'Cq': [20.0, 25.0, 21.0, np.nan]})
+    table = replicate_table(data, 'Cq')
+    assert list(table.columns) == ['Cq1', 'Cq2', 'Cq3', 'mean', 'stdev',
+                                   'CV%']
+    assert table.loc['A', 'Cq2'] == 21.0
+    assert table.loc['A', 'mean'] == pytest.approx(20.5)
+    assert np.isnan(table.loc['B', 'stdev'])
+    # with skipna=False a missing Cq makes the statistics of A missing
+    strict = replicate_table(data, 'Cq', skipna=False)
+    assert np.isnan(strict.loc['A', 'mean'])
+    assert strict.loc['B', 'mean'] == 25.0
+
+
+def test_wells_without_a_sample_name_are_left_out():
+    data = pd.DataFrame({'Sample': ['A', np.nan, 'A', 'B', np.nan],
+                         'Cq': [20.0, 30.0, 21.0, 25.0, 31.0]})
+    table = replicate_table(data, 'Cq', prefix='Cq')
+    assert list(table.index) == ['A', 'B']
+    assert list(table.columns) == ['Cq1', 'Cq2', 'mean', 'stdev', 'CV%']
+    assert table.loc['A', 'mean'] == pytest.approx(20.5)
+
+
+def test_normalize_plates():
+    data = pd.DataFrame({'plate': [1, 1, 2, 2, 3],
+                         'Sample': ['mix', 'S1', 'mix', 'S2', 'S3'],
+                         'Cq': [20.0, 25.0, 21.0, 26.0, 27.0]})
+    data = normalize_plates(data, data['Sample'] == 'mix', 1)
+    # plate 3 has no sample mix and is not shifted
+    assert data['corrected Cq'].tolist() == [20.0, 25.0, 20.0, 25.0, 27.0]
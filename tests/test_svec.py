@@ -0,0 +1,100 @@
+"""
+Checks of the SVEC qPCR session: plate normalization and refitting the
+standard curve when powers are excluded or included again.
+Run from the root of the repository with:  python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from moltools.svec import QPCRSession
+
+# Standard curve of the plates: Cq = INTERCEPT + SLOPE * log10(copies)
+SLOPE = -3.3
+INTERCEPT = 40.0
+STD_CURVE_COPIES = 4.0
+
+
+def expected_copies(cq, dilution=1):
+    return 10 ** ((cq - INTERCEPT) / SLOPE) * dilution
+
+
+@pytest.fixture
+def run_folder(tmp_path):
+    standards = []
+    for power in range(5):
+        cq = INTERCEPT + SLOPE * np.log10(STD_CURVE_COPIES * 10 ** power)
+        if power == 0:
+            # the lowest standard is off the line
+            cq += 2
+        standards += [(f'10^{power}', cq)] * 3
+    # a well without a sample name
+    pcr_1 = standards + [('STD', 20.0)] * 3 + [('S1', 25.0)] * 3 + [
+        (None, 33.0)]
+    # PCR_2 runs 0.5 cycles later than PCR_1
+    pcr_2 = [('STD', 20.5)] * 3 + [('S2', 26.5), ('S2', 26.5), ('S2', 26.5)]
+    for name, rows in (('PCR_1', pcr_1), ('PCR_2', pcr_2)):
+        pd.DataFrame(rows, columns=['Sample', 'Cq']).to_csv(
+            tmp_path / f'RUN_{name}.csv', index=False)
+    pd.DataFrame({'Sample': ['S1', 'S2'], 'Dilution': [10, 1]}).to_csv(
+        tmp_path / 'RUN_dilution_rates.csv', index=False)
+    return str(tmp_path)
+
+
+def copies_of(results):
+    return dict(zip(results['Sample'],
+                    results['Extract_copies/µL'].astype(float)))
+
+
+def test_plates_are_normalized_on_the_std(run_folder):
+    session = QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES)
+    assert session.STD_samples['Correction'].tolist() == pytest.approx(
+        [0.0, 0.5])
+    assert session.plate('PCR_2')['Corrected_Cq'].tolist() == pytest.approx(
+        [20.0] * 3 + [26.0] * 3)
+
+
+def test_exclusion_refits_the_curve(run_folder):
+    session = QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES)
+    before = copies_of(session.results())
+    assert session.curve.r2 < 0.999
+
+    after = copies_of(session.exclude(0))
+    assert session.power_to_skip == [0]
+    assert session.curve.slope == pytest.approx(SLOPE)
+    assert session.curve.intercept == pytest.approx(INTERCEPT)
+    assert after['S1'] == pytest.approx(expected_copies(25.0, 10), rel=1e-2)
+    assert after['S2'] == pytest.approx(expected_copies(26.0), rel=1e-2)
+    assert after != before
+    assert len(session.skipped_values) == 3
+
+
+def test_include_gives_the_first_results_again(run_folder):
+    session = QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES)
+    first_curve = session.curve
+    first = session.results()
+    session.exclude(0)
+    again = session.include(0)
+    assert session.power_to_skip == []
+    # the fit of the same standards is reused
+    assert session.curve is first_curve
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_skipped_powers_at_the_start(run_folder):
+    session = QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES,
+                          power_to_skip=[0])
+    assert copies_of(session.results()) == copies_of(
+        QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES).exclude(0))
+
+
+def test_wells_without_a_sample_name_are_left_out(run_folder):
+    results = QPCRSession(run_folder, 'RUN', STD_CURVE_COPIES).results()
+    assert results['Sample'].tolist() == ['S1', 'S2']
+    assert [column for column in results.columns
+            if column.startswith('Corrected_Cq_')] == [
+        'Corrected_Cq_1', 'Corrected_Cq_2', 'Corrected_Cq_3']